@@ -1,11 +1,18 @@
-from typing import List, Dict, Any
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.tools import tool
+from cache import DiskCache
 from configs import config
 from tools import visualization_tools
 import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
 
 @tool
 async def generate_visualization_video(manim_script: str, scene_name: str = "Scene") -> str:
@@ -17,12 +24,56 @@ async def generate_visualization_video(manim_script: str, scene_name: str = "Sce
     else:
         return f"Error generating video: {result['error']}"
 
+@functools.lru_cache(maxsize=128)
+def _system_message(system_prompt: str) -> SystemMessage:
+    """Build the SystemMessage for a prompt once and reuse it across calls"""
+    return SystemMessage(content=system_prompt)
+
+_MESSAGE_TYPES = {"user": HumanMessage, "assistant": AIMessage}
+
+def _convert_history(messages: List[Dict[str, str]]) -> List:
+    """Convert user/assistant message dicts to LangChain messages in a single pass"""
+    return [
+        _MESSAGE_TYPES[msg["role"]](content=msg["content"])
+        for msg in messages
+        if msg["role"] in _MESSAGE_TYPES
+    ]
+
+_genai_configured = False
+
+def _configure_genai():
+    """Configure the Gemini API once per process"""
+    global _genai_configured
+    if not _genai_configured:
+        # Imported here so loading this module doesn't pull in the google SDK
+        import google.generativeai as genai
+        genai.configure(api_key=config.GEMINI_API_KEY)
+        _genai_configured = True
+
+def _block_to_text(block: Any) -> str:
+    """Return the text of a single content block, using its text field when present"""
+    if isinstance(block, str):
+        return block
+    if isinstance(block, dict) and "text" in block:
+        return block["text"]
+    return str(block)
+
+def _content_to_text(content: Any) -> str:
+    """Ensure LLM message content is always a string"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return '\n'.join(map(_block_to_text, content))
+    return str(content)
+
 class LearnerAgent:
     """Learning agent using Gemini Flash 2.5 with visualization tools"""
     
     def __init__(self):
-        # Configure Gemini API
-        genai.configure(api_key=config.GEMINI_API_KEY)
+        # Imported lazily: the Gemini client stack is only needed once an agent is created
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        
+        _configure_genai()
         
         # Initialize the language model with config parameters
         self.llm = ChatGoogleGenerativeAI(
@@ -31,61 +82,153 @@ class LearnerAgent:
             temperature=config.LLM_TEMPERATURE,
             max_tokens=config.LLM_MAX_TOKENS
         )
+        
+        # Cache of tool-free responses keyed by prompt, history and model settings, backed by a
+        # disk tier so repeated breakdowns and classifications survive restarts
+        self._response_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._disk_cache = None
+        if config.RESPONSE_DISK_CACHE_TTL > 0:
+            self._disk_cache = DiskCache(
+                os.path.join("cache", "responses"),
+                ttl=config.RESPONSE_DISK_CACHE_TTL,
+                max_entries=config.DISK_CACHE_MAX_ENTRIES
+            )
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _cache_key(self, system_prompt: str, messages: List[Dict[str, str]]) -> str:
+        """Build a cache key from the prompt, message history and model settings"""
+        payload = json.dumps(
+            [config.GEMINI_MODEL, config.LLM_TEMPERATURE, system_prompt, messages],
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        """Return a cached response and mark it as recently used"""
+        response = self._response_cache.get(key)
+        if response is not None:
+            self._response_cache.move_to_end(key)
+        elif self._disk_cache is not None:
+            response = self._disk_cache.get(key)
+            if response is not None:
+                self._store_cached_response(key, response, persist=False)
+        if response is None:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        log.debug("💾 Response cache hit (%s hits / %s misses)", self.cache_hits, self.cache_misses)
+        return response
+    
+    def _store_cached_response(self, key: str, response: str, persist: bool = True):
+        """Store a response, evicting the least recently used entry when full"""
+        if persist and self._disk_cache is not None:
+            self._disk_cache.set(key, response)
+        if config.RESPONSE_CACHE_SIZE <= 0:
+            return
+        self._response_cache[key] = response
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > config.RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+    
+    def _trim_history(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Keep only the most recent turns to bound prompt size and cost"""
+        if len(messages) > config.MAX_HISTORY_MESSAGES:
+            return messages[-config.MAX_HISTORY_MESSAGES:]
+        return messages
+    
+    def _prepare_messages(self, system_prompt: str, messages: List[Dict[str, str]]) -> List:
+        """Convert a system prompt and message history into LangChain messages"""
+        llm_messages = [_system_message(system_prompt)]
+        
+        # Add conversation history (skipped entirely when there is none)
+        if messages:
+            llm_messages.extend(_convert_history(messages))
+        
+        return llm_messages
     
-    async def get_response(self, system_prompt: str, messages: List[Dict[str, str]], tools: List = None) -> str:
-        """Get a response from the agent given a system prompt and message history"""
+    async def _execute_tool_call(self, tool_call: Dict[str, Any]) -> str:
+        """Execute a single tool call requested by the LLM and return its result text"""
+        log.info("🔧 Executing tool: %s", tool_call['name'])
+        if tool_call['name'] == 'generate_visualization_video':
+            # Call the tool function directly instead of using LangChain's tool calling
+            result = await generate_visualization_video.ainvoke({
+                'manim_script': tool_call['args']['manim_script'],
+                'scene_name': tool_call['args'].get('scene_name', 'Scene')
+            })
+            log.info("🔧 Tool result: %s", result)
+            return result
+        
+        # Handle other tool calls if any
+        log.warning("🔧 Unknown tool: %s", tool_call['name'])
+        return f"Unknown tool: {tool_call['name']}"
+    
+    async def _ainvoke(self, llm_messages: List, **kwargs):
+        """Call the LLM with a per-attempt timeout, retrying timed-out calls with exponential backoff"""
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            try:
+                return await asyncio.wait_for(self.llm.ainvoke(llm_messages, **kwargs), timeout=config.LLM_TIMEOUT)
+            except asyncio.TimeoutError:
+                if attempt == config.LLM_MAX_RETRIES:
+                    raise
+                delay = min(2 ** attempt, 8)
+                log.warning("⏰ LLM call timed out after %ss, retrying in %ss", config.LLM_TIMEOUT, delay)
+                await asyncio.sleep(delay)
+    
+    def store_response(self, system_prompt: str, messages: List[Dict[str, str]], response: str):
+        """
+        Cache a reply for get_response(..., cache=True). Callers store a reply only after
+        validating it, so malformed output is never replayed.
+        """
+        if response.strip():
+            self._store_cached_response(self._cache_key(system_prompt, self._trim_history(messages)), response)
+    
+    async def get_response(self, system_prompt: str, messages: List[Dict[str, str]], tools: List = None,
+                           cache: bool = False) -> str:
+        """
+        Get a response from the agent given a system prompt and message history.
+        With cache=True a reply previously saved with store_response is returned instead of
+        calling the LLM; replies are never stored here.
+        """
+        
+        messages = self._trim_history(messages)
         
-        # Prepare messages for the LLM
-        llm_messages = [SystemMessage(content=system_prompt)]
+        # Tool calls have side effects (rendered videos), so only plain responses are cached
+        if cache and not tools:
+            cached = self._get_cached_response(self._cache_key(system_prompt, messages))
+            if cached is not None:
+                return cached
         
-        # Add conversation history
-        for msg in messages:
-            if msg["role"] == "user":
-                llm_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                llm_messages.append(AIMessage(content=msg["content"]))
+        llm_messages = self._prepare_messages(system_prompt, messages)
         
         # Get response from LLM with or without tools
         if tools:
             try:
-                response = self.llm.invoke(llm_messages, tools=tools)
+                response = await self._ainvoke(llm_messages, tools=tools)
                 
                 # Check if the response contains tool calls
                 if hasattr(response, 'tool_calls') and response.tool_calls:
-                    print(f"🔧 Tool calls detected: {len(response.tool_calls)} calls")
-                    # Execute tool calls
-                    tool_results = []
-                    for tool_call in response.tool_calls:
-                        print(f"🔧 Executing tool: {tool_call['name']}")
-                        if tool_call['name'] == 'generate_visualization_video':
-                            # Call the tool function directly instead of using LangChain's tool calling
-                            result = await generate_visualization_video.ainvoke({
-                                'manim_script': tool_call['args']['manim_script'],
-                                'scene_name': tool_call['args'].get('scene_name', 'Scene')
-                            })
-                            tool_results.append(result)
-                            print(f"🔧 Tool result: {result}")
-                        else:
-                            # Handle other tool calls if any
-                            print(f"🔧 Unknown tool: {tool_call['name']}")
-                            tool_results.append(f"Unknown tool: {tool_call['name']}")
+                    log.info("🔧 Tool calls detected: %s calls", len(response.tool_calls))
+                    # Execute independent tool calls concurrently; results keep the call order
+                    tool_results = await asyncio.gather(
+                        *(self._execute_tool_call(tool_call) for tool_call in response.tool_calls)
+                    )
                     
                     # Add tool results to the response
                     if tool_results:
                         response.content += f"\n\nTool Results:\n" + "\n".join(tool_results)
                 else:
-                    print("🔧 No tool calls detected in response")
+                    log.info("🔧 No tool calls detected in response")
             except Exception as e:
-                print(f"❌ Error in tool calling: {str(e)}")
+                log.error("❌ Error in tool calling: %s", e)
                 # Fallback to regular response without tools
-                response = self.llm.invoke(llm_messages)
+                response = await self._ainvoke(llm_messages)
         else:
-            response = self.llm.invoke(llm_messages)
+            response = await self._ainvoke(llm_messages)
         
-        # Ensure response is always a string
-        if isinstance(response.content, list):
-            return '\n'.join(str(item) for item in response.content)
-        return str(response.content)
+        return _content_to_text(response.content)
 
-# Global agent instance
-learner_agent = LearnerAgent()
+@functools.lru_cache(maxsize=1)
+def get_learner_agent() -> LearnerAgent:
+    """Return the shared agent, creating it (and its Gemini client) on first use"""
+    return LearnerAgent()
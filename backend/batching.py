@@ -0,0 +1,102 @@
+"""
+Batching Module
+
+Helpers that let concurrent requests share work instead of each paying
+for their own LLM round trip:
+- MicroBatcher groups calls submitted within a short window into one batch call
+- InFlightCoalescer makes identical concurrent calls share a single computation
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Groups items submitted within window_ms (up to max_size) into one batch_fn call"""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+                 window_ms: int = 50, max_size: int = 32):
+        self._batch_fn = batch_fn
+        self._window = window_ms / 1000
+        self._max_size = max_size
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Keep references to running batches so they aren't garbage collected mid-flight
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue item for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the pending items to a background batch call"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run batch_fn once and resolve each waiter with its own result"""
+        try:
+            results = await self._batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Waiters that were cancelled while the batch ran are skipped
+            if not future.done():
+                future.set_result(result)
+
+
+class InFlightCoalescer:
+    """Runs at most one computation per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        # key -> [shared task, number of callers waiting on it]
+        self._inflight: Dict[Any, List] = {}
+
+    async def run(self, key: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Await compute() for key, joining an identical call that is already in flight"""
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = [asyncio.ensure_future(compute()), 0]
+            self._inflight[key] = entry
+            entry[0].add_done_callback(lambda _: self._forget(key, entry))
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shield the shared task so one caller being cancelled doesn't cancel it for the others
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                # Every caller gave up, so nobody needs the result any more. Forget it now rather
+                # than in the done callback, so a caller arriving meanwhile starts a fresh computation
+                # instead of joining one that is being cancelled
+                self._forget(key, entry)
+                task.cancel()
+
+    def _forget(self, key: Any, entry: List):
+        """Drop a finished or abandoned computation unless a newer one already took its key"""
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
@@ -0,0 +1,107 @@
+"""
+Disk Cache Module
+
+Small content-addressed cache that stores JSON-serializable results as files,
+so expensive LLM results survive server restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Optional
+
+log = logging.getLogger(__name__)
+
+# Expired and excess entries are pruned once every this many writes
+_PRUNE_EVERY = 100
+
+
+def make_key(*parts: str) -> str:
+    """Build a stable cache key from the given string parts"""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Stores one JSON file per key inside a cache directory. Entries expire after ttl seconds,
+    and the oldest are deleted once there are more than max_entries files (checked at startup
+    and every _PRUNE_EVERY writes, so the directory can briefly exceed the cap).
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Clean up whatever expired while the server was down
+        self.prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing, expired or unreadable"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.ttl is not None and time.time() - entry.get("stored_at", 0) > self.ttl:
+                os.remove(path)
+                return None
+            return entry["value"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store value under key, writing atomically so readers never see a partial file"""
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"value": value, "stored_at": time.time()}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.warning("Could not write cache entry %s: %s", key, e)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete expired entries, then the oldest ones beyond max_entries (by file mtime)"""
+        if self.ttl is None and self.max_entries is None:
+            return
+        try:
+            cutoff = time.time() - self.ttl if self.ttl is not None else None
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime
+                        if cutoff is not None and mtime < cutoff:
+                            os.remove(entry.path)
+                        else:
+                            entries.append((mtime, entry.path))
+                    except FileNotFoundError:
+                        pass
+
+            if self.max_entries is not None and len(entries) > self.max_entries:
+                entries.sort()
+                for _, path in entries[:len(entries) - self.max_entries]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        except OSError as e:
+            log.warning("Could not prune cache %s: %s", self.cache_dir, e)
@@ -14,10 +14,37 @@ class Config:
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash-002")
     LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
     LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4000"))
+    # Seconds before a single LLM call is abandoned, and how many times a timed-out call is retried
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    # Expiry (0 disables the disk caches) and per-directory entry cap for the on-disk result caches
+    RESPONSE_DISK_CACHE_TTL = float(os.getenv("RESPONSE_DISK_CACHE_TTL", "86400"))
+    DISK_CACHE_MAX_ENTRIES = int(os.getenv("DISK_CACHE_MAX_ENTRIES", "10000"))
+    MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
+    
+    # Learning Pipeline Configuration
+    MAX_CONCURRENT_TOPICS = int(os.getenv("MAX_CONCURRENT_TOPICS", "8"))
+    TOPIC_CACHE_SIZE = int(os.getenv("TOPIC_CACHE_SIZE", "256"))
+    BREAKDOWN_BATCH_WINDOW_MS = int(os.getenv("BREAKDOWN_BATCH_WINDOW_MS", "50"))
+    BREAKDOWN_BATCH_MAX_SIZE = int(os.getenv("BREAKDOWN_BATCH_MAX_SIZE", "32"))
+    LEARN_CACHE_SIZE = int(os.getenv("LEARN_CACHE_SIZE", "128"))
+    
+    # Visualization Configuration
+    VIDEO_CACHE_MAX_BYTES = int(os.getenv("VIDEO_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+    # Seconds before a slow visualization attempt gets a parallel hedge; 0 (default) disables hedging.
+    # Set it around the measured p95 of a visualization (LLM call + render) if enabling it
+    VIZ_HEDGE_DELAY = float(os.getenv("VIZ_HEDGE_DELAY", "0"))
+    # Concurrent Manim renders per server worker process
+    MANIM_WORKERS = int(os.getenv("MANIM_WORKERS", str(min(os.cpu_count() or 1, 4))))
     
     # App Configuration
     APP_NAME = os.getenv("APP_NAME", "HopHacks 2025 Learner App")
     DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if DEBUG else "INFO").upper()
+    # Server worker processes. Each has its own MANIM_WORKERS render slots, in-memory caches and
+    # in-flight coalescing, so the default only uses as many workers as the CPUs can render for
+    WORKERS = int(os.getenv("WORKERS", str(max(1, (os.cpu_count() or 1) // max(MANIM_WORKERS, 1)))))
     
     @classmethod
     def validate_config(cls):
@@ -32,10 +59,54 @@ class Config:
         if cls.LLM_MAX_TOKENS <= 0:
             raise ValueError("LLM_MAX_TOKENS must be a positive integer")
         
+        if cls.LLM_TIMEOUT <= 0:
+            raise ValueError("LLM_TIMEOUT must be a positive number of seconds")
+        
+        if cls.LLM_MAX_RETRIES < 0:
+            raise ValueError("LLM_MAX_RETRIES must be zero or a positive integer")
+        
+        if cls.RESPONSE_CACHE_SIZE < 0:
+            raise ValueError("RESPONSE_CACHE_SIZE must be zero or a positive integer")
+        
+        if cls.RESPONSE_DISK_CACHE_TTL < 0:
+            raise ValueError("RESPONSE_DISK_CACHE_TTL must be zero (disabled) or a positive number of seconds")
+        
+        if cls.DISK_CACHE_MAX_ENTRIES <= 0:
+            raise ValueError("DISK_CACHE_MAX_ENTRIES must be a positive integer")
+        
+        if cls.MAX_HISTORY_MESSAGES <= 0:
+            raise ValueError("MAX_HISTORY_MESSAGES must be a positive integer")
+        
+        if cls.MAX_CONCURRENT_TOPICS <= 0:
+            raise ValueError("MAX_CONCURRENT_TOPICS must be a positive integer")
+        
+        if cls.TOPIC_CACHE_SIZE < 0:
+            raise ValueError("TOPIC_CACHE_SIZE must be zero or a positive integer")
+        
+        if cls.LEARN_CACHE_SIZE < 0:
+            raise ValueError("LEARN_CACHE_SIZE must be zero or a positive integer")
+        
+        if cls.VIZ_HEDGE_DELAY < 0:
+            raise ValueError("VIZ_HEDGE_DELAY must be zero (no hedging) or a positive number of seconds")
+        
+        if cls.MANIM_WORKERS <= 0:
+            raise ValueError("MANIM_WORKERS must be a positive integer")
+        
+        if cls.BREAKDOWN_BATCH_WINDOW_MS < 0:
+            raise ValueError("BREAKDOWN_BATCH_WINDOW_MS must be zero or a positive integer")
+        
+        if cls.BREAKDOWN_BATCH_MAX_SIZE <= 0:
+            raise ValueError("BREAKDOWN_BATCH_MAX_SIZE must be a positive integer")
+        
+        if cls.LOG_LEVEL not in ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"):
+            raise ValueError("LOG_LEVEL must be one of CRITICAL, ERROR, WARNING, INFO or DEBUG")
+        
+        if cls.WORKERS <= 0:
+            raise ValueError("WORKERS must be a positive integer")
+        
         return True
 
-# Create a global config instance
+# Create a global config instance, validated on import: other modules build semaphores and
+# caches from these values at import time, so bad settings must fail before they're used
 config = Config()
-
-# Validate configuration on import
 config.validate_config()
@@ -5,22 +5,76 @@ Handles the creation and management of learning blocks for the new learning modu
 Each block contains: id, topic, text content, and optional visualization path.
 """
 
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from dataclasses import dataclass, replace
+from collections import OrderedDict
+import asyncio
+import gzip
 import json
+import logging
 import os
+import random
+import re
 from datetime import datetime
-from agent import learner_agent, generate_visualization_video
+import orjson
+from batching import InFlightCoalescer, MicroBatcher
+from cache import DiskCache, make_key
+from configs import config
 from prompts import PROMPTS
 
 
-@dataclass
+log = logging.getLogger(__name__)
+
+# One match per line: leading whitespace and list markers (numbers, '.', '-', '*', ' ') are
+# consumed and the remaining text up to any trailing whitespace is captured
+_LIST_MARKERS = r'[0-9.\-* ]*+[^\S\n]*+'
+_TOPIC_LINE_RE = re.compile(rf'^[^\S\n]*+{_LIST_MARKERS}(.*?)[^\S\n]*$', re.M)
+# Same, but lines that start with a heading or emphasis marker are not captured
+_COMPONENT_LINE_RE = re.compile(rf'^[^\S\n]*+(?![#*]){_LIST_MARKERS}(.*?)[^\S\n]*$', re.M)
+
+# Outermost JSON object/array in a model reply that may be wrapped in markdown fences or prose
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.S)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.S)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Write buffer for save_blocks (256 KiB)
+_SAVE_BUFFER_SIZE = 1 << 18
+
+# Topics mentioning any of these are visual enough to skip the visualization classifier
+_VISUAL_KEYWORDS_RE = re.compile(
+    r'\b(graphs?|functions?|charts?|matri(?:x|ces)|vectors?|geometry|equations?|plots?|'
+    r'diagrams?|visuali[sz]e|visuali[sz]ation|derivatives?|integrals?)\b',
+    re.I
+)
+
+# Lines appended by the generate_visualization_video tool after "Tool Results:"
+_VIDEO_SUCCESS_RE = re.compile(r'Video generated successfully:(.*)')
+_VIDEO_ERROR_RE = re.compile(r'Error generating video:(.*)')
+
+
+def _learner_agent():
+    """Import the agent on first use; it pulls in LangChain, which LearningBlock/load_blocks users don't need"""
+    from agent import get_learner_agent
+    return get_learner_agent()
+
+
+def _normalize_topic(topic: str) -> str:
+    """Cache key for a topic: case- and whitespace-insensitive ("Derivatives " == "derivatives")"""
+    return _WHITESPACE_RE.sub(' ', topic.strip().lower())
+
+
+@dataclass(slots=True, frozen=True)
 class LearningBlock:
     """Represents a single learning block with topic, content, and visualization"""
     id: int
     topic: str
     text_content: str
     visualization_path: Optional[str] = None
+    # False if generation failed or a wanted visualization couldn't be produced (not serialized)
+    complete: bool = True
+    # True if generating the block raised, so text_content is just the error message (not serialized)
+    failed: bool = False
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert block to dictionary for JSON serialization"""
@@ -35,27 +89,117 @@ class LearningBlock:
 class LearningBlockProcessor:
     """Processes topics into learning blocks with visualizations"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent_topics: Optional[int] = None):
         self.visualizations_dir = "visualizations"
+        # Caps how many topics are generated at once to respect LLM provider rate limits
+        self._topic_semaphore = asyncio.Semaphore(max_concurrent_topics or config.MAX_CONCURRENT_TOPICS)
         self._ensure_visualizations_dir()
+        
+        # Concurrent topic breakdowns share one agent call
+        self._breakdown_batcher = MicroBatcher(
+            self._break_down_batch,
+            window_ms=config.BREAKDOWN_BATCH_WINDOW_MS,
+            max_size=config.BREAKDOWN_BATCH_MAX_SIZE
+        )
+        
+        # Persistent caches of visualization results (keyed by prompt hash) and of breakdowns (keyed
+        # by normalized topic, so repeat requests skip the first LLM call entirely). Generated text
+        # needs no cache of its own: its tool-free call opts into the agent's response cache
+        self._visualization_cache = self._disk_cache("visualizations")
+        self._breakdown_disk_cache = self._disk_cache("breakdowns")
+        
+        # Identical breakdown/topic calls that are already running are joined rather than repeated
+        self._inflight = InFlightCoalescer()
+        
+        # In-memory LRU memoization of whole breakdowns (by variant + normalized topic) and blocks (by topic + preferences)
+        self._breakdown_cache: OrderedDict = OrderedDict()
+        self._block_cache: OrderedDict = OrderedDict()
+    
+    def _disk_cache(self, name: str) -> Optional[DiskCache]:
+        """A disk cache under cache/<name>, or None if disk caching is disabled"""
+        if config.RESPONSE_DISK_CACHE_TTL <= 0:
+            return None
+        return DiskCache(
+            os.path.join("cache", name),
+            ttl=config.RESPONSE_DISK_CACHE_TTL,
+            max_entries=config.DISK_CACHE_MAX_ENTRIES
+        )
     
     def _ensure_visualizations_dir(self):
         """Create visualizations directory if it doesn't exist"""
-        if not os.path.exists(self.visualizations_dir):
-            os.makedirs(self.visualizations_dir)
+        os.makedirs(self.visualizations_dir, exist_ok=True)
+    
+    def _get_memoized(self, cache: OrderedDict, key: Any) -> Optional[Any]:
+        """Return a memoized result and mark it as recently used"""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+    
+    def _store_memoized(self, cache: OrderedDict, key: Any, value: Any):
+        """Memoize a result, evicting the least recently used entry when full"""
+        if config.TOPIC_CACHE_SIZE <= 0:
+            return
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > config.TOPIC_CACHE_SIZE:
+            cache.popitem(last=False)
+    
+    def _get_cached_breakdown(self, variant: str, cache_key: str
+                              ) -> Optional[Tuple[Tuple[str, ...], Optional[Tuple[bool, ...]]]]:
+        """
+        Look up a breakdown in memory, then on disk (promoting disk hits into memory). Each variant
+        ("plain" or "viz") uses its own prompt, so its entries are kept apart from the other's
+        """
+        cached = self._get_memoized(self._breakdown_cache, (variant, cache_key))
+        if cached is not None:
+            return cached
+        
+        if self._breakdown_disk_cache is None:
+            return None
+        stored = self._breakdown_disk_cache.get(make_key(config.GEMINI_MODEL, variant, cache_key))
+        if not isinstance(stored, dict) or not stored.get("components"):
+            return None
+        flags = stored.get("needs_visualization")
+        cached = (tuple(stored["components"]), tuple(flags) if flags is not None else None)
+        self._store_memoized(self._breakdown_cache, (variant, cache_key), cached)
+        return cached
+    
+    def _store_cached_breakdown(self, variant: str, cache_key: str, components: List[str],
+                                needs_visualization: Optional[List[bool]]):
+        """Remember a breakdown of the given variant in memory and on disk"""
+        self._store_memoized(self._breakdown_cache, (variant, cache_key), (
+            tuple(components),
+            tuple(needs_visualization) if needs_visualization is not None else None
+        ))
+        if self._breakdown_disk_cache is not None:
+            self._breakdown_disk_cache.set(
+                make_key(config.GEMINI_MODEL, variant, cache_key),
+                {"components": components, "needs_visualization": needs_visualization}
+            )
     
     async def break_down_topic(self, topic: str) -> List[str]:
         """
         Break down a single topic into component subtopics using an agent call.
         """
-        print(f"🔍 Breaking down topic: {topic}")
+        cache_key = _normalize_topic(topic)
+        cached = self._get_cached_breakdown("plain", cache_key)
+        if cached is not None:
+            log.debug("💾 Using memoized breakdown for topic: %s", topic)
+            return list(cached[0])
+        
+        return await self._inflight.run(("breakdown", cache_key), lambda: self._break_down_topic(topic, cache_key))
+    
+    async def _break_down_topic(self, topic: str, cache_key: str) -> List[str]:
+        """Run the breakdown agent call for break_down_topic and memoize the result"""
+        log.info("🔍 Breaking down topic: %s", topic)
         
         # Use the topic breakdown prompt
         breakdown_prompt = PROMPTS["topic_breakdown"]
         user_message = f"Break down this topic into learnable components: {topic}"
         
         # Get breakdown from agent (no tools needed for this step)
-        breakdown_response = await learner_agent.get_response(
+        breakdown_response = await _learner_agent().get_response(
             breakdown_prompt, 
             [{"role": "user", "content": user_message}], 
             tools=None
@@ -63,24 +207,115 @@ class LearningBlockProcessor:
         
         # Parse the response into a list of components
         components = self._parse_breakdown_response(breakdown_response)
+        if components:
+            self._store_cached_breakdown("plain", cache_key, components, None)
         
-        print(f"📋 Found {len(components)} components: {components}")
+        log.info("📋 Found %s components: %s", len(components), components)
         return components
     
+    async def break_down_topic_with_viz_flags(self, topic: str) -> Tuple[List[str], Optional[List[bool]]]:
+        """
+        Break down a topic into components and decide per component whether it needs a
+        visualization, in a single agent call. Flags are None if the reply isn't valid JSON,
+        in which case each component falls back to the per-topic classifier.
+        Breakdowns requested at about the same time are batched into one agent call.
+        """
+        cache_key = _normalize_topic(topic)
+        cached = self._get_cached_breakdown("viz", cache_key)
+        if cached is not None:
+            log.debug("💾 Using memoized breakdown for topic: %s", topic)
+            components, needs_visualization = cached
+            return list(components), list(needs_visualization) if needs_visualization is not None else None
+        
+        components, needs_visualization = await self._inflight.run(
+            ("breakdown_with_viz", cache_key), lambda: self._break_down_topic_with_viz_flags(topic, cache_key)
+        )
+        return list(components), list(needs_visualization) if needs_visualization is not None else None
+    
+    async def _break_down_topic_with_viz_flags(self, topic: str, cache_key: str) -> Tuple[List[str], Optional[List[bool]]]:
+        """Run the (batched) breakdown for break_down_topic_with_viz_flags and memoize the result"""
+        log.info("🔍 Breaking down topic (with visualization flags): %s", topic)
+        
+        components, needs_visualization = await self._breakdown_batcher.submit(topic)
+        if components:
+            self._store_cached_breakdown("viz", cache_key, components, needs_visualization)
+        
+        log.info("📋 Found %s components: %s", len(components), components)
+        if needs_visualization is not None:
+            log.info("🎨 Visualization flags: %s", needs_visualization)
+        return components, needs_visualization
+    
+    async def _break_down_batch(self, topics: List[str]) -> List[Tuple[List[str], Optional[List[bool]]]]:
+        """Break down several topics with one agent call, retrying any it got wrong individually"""
+        if len(topics) == 1:
+            return [await self._request_breakdown(topics[0])]
+        
+        log.info("📦 Batching %s topic breakdowns into one call", len(topics))
+        results: List[Optional[Tuple[List[str], Optional[List[bool]]]]] = [None] * len(topics)
+        try:
+            response = await _learner_agent().get_response(
+                PROMPTS["topic_breakdown_batch"],
+                [{"role": "user", "content": f"Break down each of these topics into learnable components: {json.dumps(topics, ensure_ascii=False)}"}],
+                tools=None
+            )
+            match = _JSON_ARRAY_RE.search(response)
+            items = json.loads(match.group(0)) if match else []
+            if isinstance(items, list) and len(items) == len(topics):
+                results = [self._breakdown_from_data(item) for item in items]
+        except Exception as e:
+            log.warning("⚠️ Batched breakdown failed, falling back to individual calls: %s", e)
+        
+        missing = [i for i, result in enumerate(results) if result is None or not result[0]]
+        if missing:
+            retried = await asyncio.gather(*(self._request_breakdown(topics[i]) for i in missing))
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+    
+    async def _request_breakdown(self, topic: str) -> Tuple[List[str], Optional[List[bool]]]:
+        """Break down a single topic with its own agent call"""
+        breakdown_response = await _learner_agent().get_response(
+            PROMPTS["topic_breakdown_with_viz"],
+            [{"role": "user", "content": f"Break down this topic into learnable components: {topic}"}],
+            tools=None
+        )
+        return self._parse_breakdown_with_viz_flags(breakdown_response)
+    
+    def _parse_breakdown_with_viz_flags(self, response: str) -> Tuple[List[str], Optional[List[bool]]]:
+        """Parse a JSON breakdown reply, falling back to the line-based parser"""
+        match = _JSON_OBJECT_RE.search(response)
+        try:
+            data = json.loads(match.group(0)) if match else None
+        except ValueError:
+            data = None
+        
+        parsed = self._breakdown_from_data(data)
+        if parsed is None:
+            log.warning("⚠️ Breakdown reply was not valid JSON, falling back to line parsing")
+            return self._parse_breakdown_response(response), None
+        return parsed
+    
+    def _breakdown_from_data(self, data: Any) -> Optional[Tuple[List[str], Optional[List[bool]]]]:
+        """Read components and flags from a decoded breakdown object, or None if it's malformed"""
+        if not isinstance(data, dict) or not isinstance(data.get("components"), list):
+            return None
+        
+        components = [str(item).strip() for item in data["components"]]
+        flags = data.get("needs_visualization")
+        if not isinstance(flags, list) or len(flags) != len(components):
+            flags = None
+        
+        if flags is None:
+            return [item for item in components if item], None
+        
+        # Drop empty components together with their flags
+        pairs = [(item, bool(flag)) for item, flag in zip(components, flags) if item]
+        return [item for item, _ in pairs], [flag for _, flag in pairs]
+    
     def _parse_breakdown_response(self, response: str) -> List[str]:
         """Parse the breakdown response into a list of components"""
-        components = []
-        lines = response.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#') and not line.startswith('*'):
-                # Remove any numbering or bullet points
-                line = line.lstrip('0123456789.-* ').strip()
-                if line:
-                    components.append(line)
-        
-        return components
+        # Headings and emphasis lines ('#', '*') are skipped, numbering/bullets are removed
+        return [item for item in _COMPONENT_LINE_RE.findall(response) if item]
     
     def parse_topics(self, topics_input: str) -> List[str]:
         """
@@ -90,18 +325,8 @@ class LearningBlockProcessor:
         if not topics_input or not topics_input.strip():
             return []
         
-        # Split by common delimiters
-        topics = []
-        
-        # Try splitting by newlines first
-        lines = topics_input.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line:
-                # Remove common list markers (1., 2., -, *, etc.)
-                line = line.lstrip('0123456789.-* ').strip()
-                if line:
-                    topics.append(line)
+        # Try splitting by newlines first, removing common list markers (1., 2., -, *, etc.)
+        topics = [item for item in _TOPIC_LINE_RE.findall(topics_input) if item]
         
         # If we only got one topic, try splitting by commas
         if len(topics) == 1 and ',' in topics[0]:
@@ -109,40 +334,95 @@ class LearningBlockProcessor:
         
         return topics
     
-    async def process_topic(self, topic: str, topic_id: int, user_preferences: str = "") -> LearningBlock:
+    async def process_topic(self, topic: str, topic_id: int, user_preferences: str = "",
+                            needs_visualization: Optional[bool] = None) -> LearningBlock:
         """
         Process a single topic into a learning block using two-step approach:
         1. Generate text content (no tools)
         2. Generate visualization based on text content (if appropriate)
+        If needs_visualization is already known (e.g. from the breakdown), the classifier call is skipped.
         """
-        print(f"📚 Processing topic {topic_id}: {topic}")
-        
-        # Step 1: Generate text content (no tools)
-        text_content = await self._generate_text_content(topic, user_preferences)
-        
-        # Step 2: Generate visualization based on text content (if appropriate)
-        visualization_path = await self._generate_visualization(topic, text_content)
-        
-        return LearningBlock(
+        cache_key = (topic, user_preferences)
+        cached_block = self._get_memoized(self._block_cache, cache_key)
+        if cached_block is not None:
+            log.debug("💾 Using memoized block for topic %s: %s", topic_id, topic)
+            return replace(cached_block, id=topic_id)
+        
+        block = await self._inflight.run(
+            ("block",) + cache_key,
+            lambda: self._generate_block(topic, topic_id, user_preferences, needs_visualization)
+        )
+        return block if block.id == topic_id else replace(block, id=topic_id)
+    
+    async def _generate_block(self, topic: str, topic_id: int, user_preferences: str,
+                              needs_visualization: Optional[bool]) -> LearningBlock:
+        """Generate the text and visualization for process_topic and memoize the block"""
+        async with self._topic_semaphore:
+            log.info("📚 Processing topic %s: %s", topic_id, topic)
+            
+            # Step 1: Generate text content (no tools) while a quick classifier call decides
+            # whether the topic is worth visualizing at all
+            if needs_visualization is None and _VISUAL_KEYWORDS_RE.search(topic):
+                # Obviously visual topics don't need the classifier's round trip
+                needs_visualization = True
+            if needs_visualization is None:
+                needs_visualization, text_content = await asyncio.gather(
+                    self._classify_needs_visualization(topic),
+                    self._generate_text_content(topic, user_preferences)
+                )
+            else:
+                text_content = await self._generate_text_content(topic, user_preferences)
+            
+            # Step 2: Generate visualization based on text content (if appropriate)
+            visualization_path = None
+            if needs_visualization:
+                visualization_path = await self._generate_visualization(topic, text_content)
+            else:
+                log.info("ℹ️ Skipping visualization for topic: %s - classified as not needing one", topic)
+        
+        block = LearningBlock(
             id=topic_id,
             topic=topic,
             text_content=text_content,
-            visualization_path=visualization_path
+            visualization_path=visualization_path,
+            complete=bool(visualization_path or not needs_visualization)
         )
+        # Don't memoize a block whose visualization was wanted but couldn't be produced
+        if block.complete:
+            self._store_memoized(self._block_cache, (topic, user_preferences), block)
+        return block
+    
+    async def _classify_needs_visualization(self, topic: str) -> bool:
+        """Decide from the topic alone whether a visualization is worth generating"""
+        try:
+            messages = [{"role": "user", "content": f"Topic: {topic}"}]
+            answer = await _learner_agent().get_response(
+                PROMPTS["visualization_classifier"], messages, tools=None, cache=True
+            )
+            verdict = answer.strip().upper()
+            # Only a clear YES/NO is worth replaying
+            if verdict.startswith(("YES", "NO")):
+                _learner_agent().store_response(PROMPTS["visualization_classifier"], messages, answer)
+            return not verdict.startswith("NO")
+        except Exception as e:
+            # Fall back to attempting a visualization, as before the classifier existed
+            log.warning("⚠️ Visualization classifier failed for '%s': %s", topic, e)
+            return True
     
     async def _generate_text_content(self, topic: str, user_preferences: str = "") -> str:
         """Generate detailed text content for the topic (no tools)"""
-        print(f"📝 Generating text content for: {topic}")
+        log.info("📝 Generating text content for: %s", topic)
         
-        text_prompt = self._create_text_prompt(user_preferences)
+        # The system prompt stays byte-identical across calls so Gemini can reuse its prefix;
+        # per-request details (topic, preferences) go in the user message
+        text_prompt = self._create_text_prompt()
         user_message = f"Create comprehensive learning content for this specific topic: {topic}"
+        if user_preferences and user_preferences.strip():
+            user_message += f"\n\nUser Preferences: {user_preferences}"
         
         # Generate content without tools to focus on text
-        content = await learner_agent.get_response(
-            text_prompt, 
-            [{"role": "user", "content": user_message}], 
-            tools=None
-        )
+        messages = [{"role": "user", "content": user_message}]
+        content = await _learner_agent().get_response(text_prompt, messages, tools=None, cache=True)
         
         # Ensure content is a string
         if isinstance(content, list):
@@ -150,28 +430,30 @@ class LearningBlockProcessor:
         
         # Clean and validate content
         content = str(content).strip()
+        if content:
+            _learner_agent().store_response(text_prompt, messages, content)
         
-        # Check if content is too long and needs trimming
-        word_count = len(content.split())
+        # Check if content is too long and needs trimming (split once and reuse the words)
+        words = content.split()
+        word_count = len(words)
         if word_count > 250:  # Allow some buffer above 200 word limit
-            print(f"⚠️ Content too long ({word_count} words), trimming for '{topic}'")
+            log.warning("⚠️ Content too long (%s words), trimming for '%s'", word_count, topic)
             # Keep only the first 200 words
-            words = content.split()[:200]
-            content = ' '.join(words) + "..."
+            content = ' '.join(words[:200]) + "..."
+            word_count = 200
         
         # Fallback: If no content was generated, create a basic explanation
         if not content:
             content = f"# {topic}\n\nEssential concepts for {topic.lower()}. Research this topic further for detailed information."
-            print(f"⚠️ No text content generated for '{topic}', using fallback content")
+            log.warning("⚠️ No text content generated for '%s', using fallback content", topic)
         else:
-            final_word_count = len(content.split())
-            print(f"✅ Generated {len(content)} characters ({final_word_count} words) of text content for '{topic}'")
+            log.info("✅ Generated %s characters (%s words) of text content for '%s'", len(content), word_count, topic)
         
         return content
     
     async def _generate_visualization(self, topic: str, text_content: str) -> Optional[str]:
         """Generate visualization based on text content (if appropriate) with retry logic"""
-        print(f"🎨 Considering visualization for: {topic}")
+        log.info("🎨 Considering visualization for: %s", topic)
         
         viz_prompt = self._create_visualization_prompt()
         user_message = f"""Analyze this topic to determine if it would benefit from visual representation to show logic/setup intuitively:
@@ -202,390 +484,345 @@ Then create a Manim animation that:
 
 Use the generate_visualization_video tool to create the animation."""
         
-        # Retry logic for visualization generation
+        cache_key = make_key(config.GEMINI_MODEL, viz_prompt, user_message)
+        cached = self._visualization_cache.get(cache_key) if self._visualization_cache is not None else None
+        if cached is not None:
+            cached_path = cached.get("visualization_path")
+            # Only trust a cached video if the file is still on disk
+            if cached_path is None or os.path.exists(os.path.join(self.visualizations_dir, cached_path)):
+                log.debug("💾 Using cached visualization result for topic: %s", topic)
+                return cached_path
+        
+        # Retry logic for visualization generation. Failed attempts are retried with error feedback
+        # (up to max_retries attempts in total). If hedging is enabled (VIZ_HEDGE_DELAY > 0), an
+        # attempt still running after that many seconds also gets a parallel attempt, from a
+        # separate budget so hedges never use up the feedback retries; the first to finish wins
         max_retries = 3
-        learning_tools = [generate_visualization_video]
-        
-        for attempt in range(1, max_retries + 1):
-            print(f"🎨 Visualization attempt {attempt}/{max_retries} for topic: {topic}")
-            
-            try:
-                # Generate visualization with tools
-                content = await learner_agent.get_response(
-                    viz_prompt, 
-                    [{"role": "user", "content": user_message}], 
-                    tools=learning_tools
+        max_hedges = 2 if config.VIZ_HEDGE_DELAY > 0 else 0
+        max_attempts = max_retries + max_hedges
+        attempts_started = 0
+        retries_started = 1  # The first attempt counts against max_retries
+        hedges_started = 0
+        pending = set()
+        # The first message stays identical across attempts so the provider can reuse the prompt
+        # prefix; feedback about the latest failed render is appended after it rather than mixed in
+        base_messages = [{"role": "user", "content": user_message}]
+        feedback_messages: List[Dict[str, str]] = []
+        
+        def start_attempt():
+            nonlocal attempts_started
+            attempts_started += 1
+            pending.add(asyncio.create_task(self._visualization_attempt(
+                topic, viz_prompt, base_messages + feedback_messages, attempts_started, max_attempts
+            )))
+        
+        start_attempt()
+        try:
+            while pending:
+                can_hedge = hedges_started < max_hedges
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=config.VIZ_HEDGE_DELAY if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
                 )
                 
-                # Extract visualization path from tool results
-                visualization_path = self._extract_visualization_path(content)
-                
-                # Check if there was a tool error
-                tool_error = self._extract_tool_error(content)
+                if not done:
+                    log.info("⏱️ Visualization for topic '%s' is slow, hedging with another attempt", topic)
+                    hedges_started += 1
+                    start_attempt()
+                    continue
                 
-                if tool_error:
-                    print(f"❌ Visualization attempt {attempt} failed: {tool_error}")
-                    if attempt < max_retries:
-                        print(f"🔄 Retrying visualization for topic: {topic}")
-                        import asyncio
-                        await asyncio.sleep(2)  # Wait 2 seconds before retry
-                        continue
+                for task in done:
+                    attempt, visualization_path, tool_error, feedback = task.result()
+                    if tool_error:
+                        log.error("❌ Visualization attempt %s failed: %s", attempt, tool_error)
+                        if feedback:
+                            feedback_messages = feedback
+                    elif visualization_path:
+                        log.info("✅ Visualization created for topic: %s (attempt %s)", topic, attempt)
+                        self._store_visualization_result(cache_key, visualization_path)
+                        return visualization_path
                     else:
-                        print(f"❌ All visualization attempts failed for topic: {topic}")
+                        log.info("ℹ️ No visualization created for topic: %s - AI determined it's not needed", topic)
+                        self._store_visualization_result(cache_key, None)
                         return None
-                elif visualization_path:
-                    print(f"✅ Visualization created for topic: {topic} (attempt {attempt})")
-                    return visualization_path
-                else:
-                    print(f"ℹ️ No visualization created for topic: {topic} - AI determined it's not needed")
-                    return None
-                    
-            except Exception as e:
-                print(f"❌ Visualization attempt {attempt} error: {str(e)}")
-                if attempt < max_retries:
-                    print(f"🔄 Retrying visualization for topic: {topic}")
-                    import asyncio
-                    await asyncio.sleep(2)  # Wait 2 seconds before retry
-                    continue
-                else:
-                    print(f"❌ All visualization attempts failed for topic: {topic}")
-                    return None
+                
+                # Every finished attempt failed; retry unless a hedged attempt is still running
+                if not pending and retries_started < max_retries:
+                    log.info("🔄 Retrying visualization for topic: %s", topic)
+                    await self._retry_backoff(retries_started)
+                    retries_started += 1
+                    start_attempt()
+            
+            log.error("❌ All visualization attempts failed for topic: %s", topic)
+            return None
+        finally:
+            # Cancel attempts that lost the race (this also stops their Manim renders)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _store_visualization_result(self, cache_key: str, visualization_path: Optional[str]):
+        """Remember a visualization outcome on disk (a None path means none was needed)"""
+        if self._visualization_cache is not None:
+            self._visualization_cache.set(cache_key, {"visualization_path": visualization_path})
+    
+    async def _visualization_attempt(self, topic: str, viz_prompt: str, messages: List[Dict[str, str]],
+                                     attempt: int, max_attempts: int
+                                     ) -> Tuple[int, Optional[str], Optional[str], Optional[List[Dict[str, str]]]]:
+        """
+        Run one visualization attempt and return (attempt, visualization path, error, feedback),
+        where feedback holds the messages to send with a retry after a failed render
+        """
+        from agent import generate_visualization_video
         
-        return None
+        log.info("🎨 Visualization attempt %s/%s for topic: %s", attempt, max_attempts, topic)
+        try:
+            # Generate visualization with tools
+            content = await _learner_agent().get_response(
+                viz_prompt, 
+                messages, 
+                tools=[generate_visualization_video]
+            )
+        except Exception as e:
+            return attempt, None, f"error: {str(e)}", None
+        
+        # Extract visualization path and any tool error from tool results
+        reply, visualization_path, tool_error = self._parse_tool_results(content)
+        feedback = None
+        if tool_error:
+            feedback = [
+                {"role": "assistant", "content": reply or "I created a Manim script with the generate_visualization_video tool."},
+                {"role": "user", "content": f"Previous attempt failed with error: {tool_error}\nPlease fix the Manim script and call generate_visualization_video again."}
+            ]
+        return attempt, visualization_path, tool_error, feedback
+    
+    async def _retry_backoff(self, attempt: int):
+        """Wait before the next retry: exponential backoff with jitter so parallel topics don't retry in lockstep"""
+        await asyncio.sleep(2 ** (attempt - 1) + random.random())
     
-    def _create_text_prompt(self, user_preferences: str) -> str:
+    def _create_text_prompt(self) -> str:
         """Create prompt focused on text content generation (no tools)"""
-        base_prompt = """You are an expert learning assistant that creates CONCISE, focused learning content.
-
-TASK: Create brief educational text (MAX 200 words) that explains the topic efficiently.
-
-REQUIRED FORMAT:
-- Use markdown headings (##, ###)
-- Bullet points for key concepts
-- Brief examples only
-- No fluff or rambling
-
-CONTENT REQUIREMENTS:
-- Core concept explanation (1-2 sentences)
-- Key points (bullet list)
-- 1 practical example
-- Essential applications only
-
-STRICT GUIDELINES:
-- MAX 200 words total
-- Be direct and to the point
-- No repetitive explanations
-- No filler words or phrases
-- Focus on actionable information
-- Use simple, clear language
-- Get to the point quickly
-
-Create focused content that teaches effectively in minimal words."""
-        
-        if user_preferences and user_preferences.strip():
-            base_prompt += f"\n\nUser Preferences: {user_preferences}"
-        
-        return base_prompt
+        return PROMPTS["text_content"]
     
     def _create_visualization_prompt(self) -> str:
         """Create prompt focused on visualization generation based on text content"""
-        return """You are an expert at creating educational visualizations using Manim.
-
-Your task is to analyze topics and determine if they would benefit from visual representation to show logic/setup intuitively.
-
-ANALYSIS CRITERIA - CREATE VISUALIZATIONS FOR TOPICS THAT ARE:
-1. LOGICAL/CONCEPTUAL: Topics that involve logical relationships, processes, or structures
-2. VISUAL BY NATURE: Concepts that are inherently spatial, geometric, or diagrammatic
-3. PROCESS-ORIENTED: Step-by-step procedures, workflows, or transformations
-4. RELATIONSHIP-BASED: Concepts involving connections, hierarchies, or dependencies
-5. ABSTRACT BUT VISUALIZABLE: Complex ideas that can be simplified through visual representation
-
-STRONG CANDIDATES FOR VISUALIZATION:
-- Data structures (arrays, trees, graphs, linked lists, stacks, queues, hash tables)
-- Algorithms (sorting, searching, traversal, data structure operations)
-- Mathematical concepts (functions, graphs, equations, geometric shapes, vectors, matrices)
-- Logical systems (boolean logic, decision trees, flowcharts)
-- Scientific processes (step-by-step procedures, transformations, cycles)
-- Spatial relationships (hierarchies, connections, flows, networks)
-- Abstract concepts that involve structure, organization, or systematic thinking
-- Any topic where "showing" the concept would be more effective than just "telling"
-
-WEAK CANDIDATES (usually don't need visualization):
-- Pure text-based topics (writing, literature, history)
-- Memorization-heavy subjects (vocabulary, facts, dates)
-- Topics that are purely theoretical without practical application
-- Simple definitions or explanations that don't involve relationships or processes
-
-DECISION PROCESS:
-1. Analyze the topic name and text content
-2. Ask: "Would a visual diagram, flowchart, or animation help explain this concept?"
-3. Ask: "Is this topic about relationships, processes, structures, or logical flow?"
-4. If YES to either question, create a visualization
-5. If NO to both questions, skip visualization
-
-When creating visualizations, focus on:
-- Showing the logical structure or flow
-- Illustrating relationships between components
-- Demonstrating processes step-by-step
-- Making abstract concepts concrete and visual
-
-When creating visualizations, follow these STRICT rules to avoid errors:
-
-1. MANIM SCRIPT STRUCTURE:
-   - Always start with: from manim import *
-   - Always define a class that inherits from Scene
-   - Always have a construct() method
-   - Use proper indentation (4 spaces)
-
-2. FORBIDDEN METHODS/OBJECTS (will cause errors):
-   - NEVER use: MathTex, Tex, NumberLine, get_graph_label, get_x_axis_label, get_y_axis_label, add_coordinates()
-   - NEVER use: add_coordinate_labels() - this method doesn't exist, use Text() labels instead
-   - NEVER use: Image() - not available, use Text() or other basic shapes instead
-   - NEVER use: align_left, align_right, align_center - these methods don't exist on Text objects
-   - NEVER use: include_numbers=True, dx_color, stroke_width, add_brackets, add_row_indices parameters
-   - NEVER use: get_end_point() - use get_end() instead
-   - NEVER use: get_tangent_line() - not available in this version
-   - NEVER use: get_vertical_line_graph() - not available in this version
-   - NEVER use: get_area() with x_range parameters - use different approach
-   - NEVER use: coords_to_point() for animations - use Dot() instead
-   - NEVER use: Matrix() with complex parameters - use Text() instead
-   - NEVER use: Table() with add_row_indices or other complex parameters - use Text() instead
-   - NEVER use: plot_arrow_from_origin_to_coords() - not available in this version
-   - NEVER use: get_vector() with color parameter - use Arrow() instead
-   - NEVER use: any method with unexpected keyword arguments
-   - NEVER use: any complex mathematical objects that require LaTeX
-
-3. REQUIRED PATTERNS:
-   - ALWAYS use Text() for all labels and text
-   - ALWAYS set axis_config={"include_numbers": False} for Axes
-   - ALWAYS use .animate for animations, never pass methods to self.play()
-   - ALWAYS use Axes() instead of NumberLine for coordinate systems
-   - ALWAYS use proper method calls: axes.x_axis.get_end() not get_end_point()
-
-4. CORRECT ANIMATION PATTERNS:
-   - Use: self.play(Create(object)) for creating objects
-   - Use: self.play(Write(text)) for text
-   - Use: self.play(object.animate.set_color(COLOR)) for color changes
-   - Use: self.play(object.animate.move_to(position)) for movement
-   - Use: self.play(FadeOut(object)) for removing objects
-
-5. SIMPLE EXAMPLE TEMPLATES:
-
-For any topic, you can create simple visualizations like:
-
-```python
-from manim import *
-
-class SimpleConceptScene(Scene):
-    def construct(self):
-        # Simple text-based visualization
-        title = Text("Topic Name").to_edge(UP)
-        self.play(Write(title))
-        
-        # Key points
-        point1 = Text("Key Point 1").next_to(title, DOWN, buff=1)
-        point2 = Text("Key Point 2").next_to(point1, DOWN, buff=0.5)
-        point3 = Text("Key Point 3").next_to(point2, DOWN, buff=0.5)
-        
-        self.play(Write(point1))
-        self.wait(0.5)
-        self.play(Write(point2))
-        self.wait(0.5)
-        self.play(Write(point3))
-        self.wait(1)
-```
-
-```python
-from manim import *
-
-class SimpleDiagramScene(Scene):
-    def construct(self):
-        # Simple diagram
-        title = Text("Concept Diagram").to_edge(UP)
-        self.play(Write(title))
-        
-        # Create simple shapes
-        circle = Circle(radius=1, color=BLUE)
-        square = Square(side_length=1.5, color=RED).next_to(circle, RIGHT, buff=1)
-        
-        # Add labels
-        circle_label = Text("A").move_to(circle)
-        square_label = Text("B").move_to(square)
-        
-        # Animate
-        self.play(Create(circle), Write(circle_label))
-        self.wait(0.5)
-        self.play(Create(square), Write(square_label))
-        self.wait(1)
-```
-
-6. COMMON FIXES:
-   - For vectors: Use Arrow(start_point, end_point) instead of axes.get_vector() or axes.plot_arrow_from_origin_to_coords()
-   - For matrices: Use Text() with proper formatting instead of Matrix() or Table()
-   - For areas: Use Polygon() with calculated points instead of get_area()
-   - For animations: Always use .animate, never pass methods directly
-   - For arrows: Use Arrow(start_point, end_point) instead of axes methods
-   - For tables: Use Text() with newlines instead of Table()
-   - For mathematical expressions: Use Text() instead of MathTex() or Tex()
-   - For coordinate systems: Use Axes() instead of NumberLine()
-   - For coordinate labels: Use Text() positioned manually instead of add_coordinate_labels()
-   - For images: Use Text() or basic shapes instead of Image()
-   - For text alignment: Use .to_edge(LEFT/RIGHT/UP/DOWN) instead of align_left/align_right
-
-7. ERROR PREVENTION:
-   - Test all method calls before using them
-   - Use simple, basic Manim objects only
-   - Avoid complex mathematical operations in Manim
-   - Keep animations simple and educational
-   - Always include self.wait() for timing
-   - When in doubt, use Text() for any mathematical content
-
-Available tools:
-- generate_visualization_video(manim_script, scene_name): Create educational videos
-
-Create a Manim script and call the generate_visualization_video tool to help students understand this topic better."""
-    
-    
-    def _extract_visualization_path(self, content: str) -> Optional[str]:
-        """Extract visualization path from tool results in content"""
-        if "Tool Results:" in content:
-            tool_section = content.split("Tool Results:")[1]
-            if "Video generated successfully:" in tool_section:
-                # Extract the path from the tool result
-                lines = tool_section.strip().split('\n')
-                for line in lines:
-                    if "Video generated successfully:" in line:
-                        # Extract path from line like "Video generated successfully: /path/to/video.mp4"
-                        path = line.split("Video generated successfully:")[1].strip()
-                        # Convert to relative path
-                        if path.startswith(self.visualizations_dir):
-                            return path.replace(self.visualizations_dir + "/", "")
-                        return path
-        return None
-    
-    def _extract_tool_error(self, content: str) -> Optional[str]:
-        """Extract error information from tool results in content"""
-        if "Tool Results:" in content:
-            tool_section = content.split("Tool Results:")[1]
-            if "Error generating video:" in tool_section:
-                # Extract the error from the tool result
-                lines = tool_section.strip().split('\n')
-                for line in lines:
-                    if "Error generating video:" in line:
-                        # Extract error from line like "Error generating video: [error message]"
-                        error = line.split("Error generating video:")[1].strip()
-                        return error
-        return None
-    
-    def _clean_content(self, content: str) -> str:
-        """Remove tool results section from content"""
-        if "Tool Results:" in content:
-            return content.split("Tool Results:")[0].strip()
-        return content
+        return PROMPTS["visualization"]
+    
+    
+    def _parse_tool_results(self, content: str) -> Tuple[str, Optional[str], Optional[str]]:
+        """Split content into (text without tool results, visualization path, tool error) in one pass"""
+        head, sep, tail = content.partition("Tool Results:")
+        if not sep:
+            return content, None, None
+        
+        visualization_path = None
+        # Path comes from a line like "Video generated successfully: /path/to/video.mp4"
+        match = _VIDEO_SUCCESS_RE.search(tail)
+        if match:
+            visualization_path = match.group(1).strip()
+            # Convert to relative path
+            if visualization_path.startswith(self.visualizations_dir):
+                visualization_path = visualization_path.replace(self.visualizations_dir + "/", "")
+        
+        # Error comes from a line like "Error generating video: [error message]"
+        match = _VIDEO_ERROR_RE.search(tail)
+        tool_error = match.group(1).strip() if match else None
+        
+        return head.strip(), visualization_path, tool_error
     
     async def process_single_topic(self, topic: str, user_preferences: str = "") -> List[LearningBlock]:
         """
         Process a single topic by breaking it down into components, then creating blocks for each component.
         """
-        print(f"🎯 Processing single topic: {topic}")
+        log.info("🎯 Processing single topic: %s", topic)
         
-        # Step 1: Break down the topic into components
-        components = await self.break_down_topic(topic)
+        # Step 1: Break down the topic into components, deciding which ones need visualizations
+        components, needs_visualization = await self.break_down_topic_with_viz_flags(topic)
         
         if not components:
-            print(f"❌ No components found for topic: {topic}")
+            log.error("❌ No components found for topic: %s", topic)
             return []
         
-        # Step 2: Process each component into a learning block
-        blocks = []
-        for i, component in enumerate(components, 1):
-            try:
-                block = await self.process_topic(component, i, user_preferences)
-                blocks.append(block)
-                print(f"✅ Completed component {i}/{len(components)}: {component}")
-            except Exception as e:
-                print(f"❌ Error processing component '{component}': {e}")
-                # Create a basic block even if processing fails
-                blocks.append(LearningBlock(
-                    id=i,
-                    topic=component,
-                    text_content=f"Error processing this component: {str(e)}",
-                    visualization_path=None
-                ))
-        
-        return blocks
+        # Step 2: Process all components into learning blocks concurrently
+        return await self._process_concurrently(components, user_preferences, "component", needs_visualization)
     
-    async def process_topics(self, topics: List[str], user_preferences: str = "") -> List[LearningBlock]:
+    async def process_topics(self, topics: List[str], user_preferences: str = "",
+                             needs_visualization: Optional[List[bool]] = None,
+                             session_id: Optional[str] = None) -> List[LearningBlock]:
         """
         Process a list of topics into learning blocks.
         This is for backward compatibility with direct topic lists.
+        If session_id is given, each block is appended to the session log as soon as it's done.
         """
-        blocks = []
-        
-        for i, topic in enumerate(topics, 1):
-            try:
-                block = await self.process_topic(topic, i, user_preferences)
-                blocks.append(block)
-                print(f"✅ Completed topic {i}/{len(topics)}: {topic}")
-            except Exception as e:
-                print(f"❌ Error processing topic '{topic}': {e}")
-                # Create a basic block even if processing fails
-                blocks.append(LearningBlock(
-                    id=i,
-                    topic=topic,
-                    text_content=f"Error processing this topic: {str(e)}",
-                    visualization_path=None
-                ))
-        
+        return await self._process_concurrently(topics, user_preferences, "topic", needs_visualization, session_id)
+    
+    async def _process_concurrently(self, topics: List[str], user_preferences: str, kind: str,
+                                    needs_visualization: Optional[List[bool]] = None,
+                                    session_id: Optional[str] = None) -> List[LearningBlock]:
+        """
+        Process topics into learning blocks concurrently, preserving their order.
+        A topic that fails still gets a basic block describing the error.
+        """
+        blocks = [block async for block in self.stream_blocks(
+            topics, user_preferences, needs_visualization, session_id, kind
+        )]
+        blocks.sort(key=lambda block: block.id)
         return blocks
     
-    def save_blocks(self, blocks: List[LearningBlock], filename: str = None) -> str:
+    async def stream_blocks(self, topics: List[str], user_preferences: str = "",
+                            needs_visualization: Optional[List[bool]] = None,
+                            session_id: Optional[str] = None, kind: str = "topic") -> AsyncIterator[LearningBlock]:
+        """
+        Process topics concurrently and yield each learning block as soon as it's done
+        (in completion order; block ids give the topic order). A topic that fails yields a
+        basic block describing the error. Closing the generator early cancels unfinished topics.
+        """
+        flags = needs_visualization
+        if flags is None or len(flags) != len(topics):
+            flags = [None] * len(topics)
+        
+        tasks = {
+            asyncio.create_task(self.process_topic(topic, i, user_preferences, flag)): (i, topic)
+            for i, (topic, flag) in enumerate(zip(topics, flags), 1)
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    topic_id, topic = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        block = task.result()
+                        log.info("✅ Completed %s %s/%s: %s", kind, topic_id, len(topics), topic)
+                    elif isinstance(error, Exception):
+                        log.error("❌ Error processing %s '%s': %s", kind, topic, error)
+                        # Create a basic block even if processing fails
+                        block = LearningBlock(
+                            id=topic_id,
+                            topic=topic,
+                            text_content=f"Error processing this {kind}: {str(error)}",
+                            visualization_path=None,
+                            complete=False,
+                            failed=True
+                        )
+                    else:
+                        raise error
+                    
+                    if session_id:
+                        # File I/O, so keep it off the event loop
+                        await asyncio.to_thread(self.append_block, block, session_id)
+                    yield block
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _session_log_path(self, session_id: str) -> str:
+        """Path of the append-only JSONL log for a session"""
+        return os.path.join(self.visualizations_dir, f"{session_id}.jsonl")
+    
+    def append_block(self, block: LearningBlock, session_id: str):
+        """
+        Append a finished block to the session's JSONL log, so progress is on disk without
+        rewriting the whole JSON file; save_blocks compacts the log at the end of the session.
+        """
+        with open(self._session_log_path(session_id), 'ab', buffering=1 << 17) as f:
+            f.write(orjson.dumps(block.to_dict()) + b"\n")
+    
+    def discard_session_log(self, session_id: str):
+        """Remove a session's log when its blocks won't be saved (e.g. the request failed)"""
+        try:
+            os.remove(self._session_log_path(session_id))
+        except FileNotFoundError:
+            pass
+    
+    def _merge_session_log(self, blocks: List[LearningBlock], session_id: str) -> List[LearningBlock]:
+        """Combine logged blocks with the given ones (given blocks win), ordered by id"""
+        merged = {}
+        try:
+            with open(self._session_log_path(session_id), 'rb') as f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                        merged[entry["id"]] = LearningBlock(**entry)
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Skip a torn last line from an interrupted write
+        except FileNotFoundError:
+            return blocks
+        
+        merged.update((block.id, block) for block in blocks)
+        return [merged[block_id] for block_id in sorted(merged)]
+    
+    def save_blocks(self, blocks: List[LearningBlock], filename: str = None,
+                    session_id: Optional[str] = None, compress: bool = False) -> str:
         """
         Save learning blocks to a JSON file for future reference.
+        If session_id is given, blocks from the session log are merged in and the log is removed.
+        If compress is True, the file is gzip-compressed and ".gz" is appended to its name.
         """
+        now = datetime.now()
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
             filename = f"learning_blocks_{timestamp}.json"
         
         filepath = os.path.join(self.visualizations_dir, filename)
         
-        # Create structured JSON data
-        blocks_data = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "total_blocks": len(blocks),
-                "version": "1.0"
-            },
-            "blocks": {}
-        }
-        
-        # Map blocks by ID
-        for block in blocks:
-            blocks_data["blocks"][str(block.id)] = {
-                "id": block.id,
-                "title": block.topic,
-                "text_content": block.text_content,
-                "visualization_path": block.visualization_path
-            }
+        if session_id:
+            blocks = self._merge_session_log(blocks, session_id)
         
-        # Save as JSON
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(blocks_data, f, indent=2, ensure_ascii=False)
+        metadata = {
+            "generated_at": now.isoformat(),
+            "total_blocks": len(blocks),
+            "version": "1.0"
+        }
         
-        print(f"💾 Learning blocks saved to: {filepath}")
+        if compress:
+            # A fast level: the saves are text-heavy, so even level 1 shrinks them a lot
+            if not filepath.endswith(".gz"):
+                filepath += ".gz"
+            f = gzip.open(filepath, 'wb', compresslevel=1)
+        else:
+            # The large buffer coalesces the many small writes into a few write() syscalls
+            f = open(filepath, 'wb', buffering=_SAVE_BUFFER_SIZE)
+        
+        # Stream the JSON one block at a time instead of building the whole document in memory
+        with f:
+            f.write(b'{\n  "metadata": ')
+            f.write(orjson.dumps(metadata))
+            f.write(b',\n  "blocks": {')
+            for index, block in enumerate(blocks):
+                # Map blocks by ID (the key is the id, so it isn't repeated inside the value)
+                f.write(b',\n    ' if index else b'\n    ')
+                f.write(orjson.dumps(str(block.id)))
+                f.write(b': ')
+                f.write(orjson.dumps({
+                    "title": block.topic,
+                    "text_content": block.text_content,
+                    "visualization_path": block.visualization_path
+                }))
+            f.write(b'\n  }\n}\n')
+        
+        if session_id:
+            # The consolidated JSON now holds everything the log had
+            self.discard_session_log(session_id)
+        
+        log.info("💾 Learning blocks saved to: %s", filepath)
         return filepath
     
     def load_blocks(self, filepath: str) -> Dict[str, Any]:
         """
-        Load learning blocks from a JSON file.
+        Load learning blocks from a JSON file (gzip-compressed if it ends in .gz).
         """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                blocks_data = json.load(f)
-            print(f"📂 Learning blocks loaded from: {filepath}")
+            opener = gzip.open if filepath.endswith(".gz") else open
+            with opener(filepath, 'rb') as f:
+                blocks_data = orjson.loads(f.read())
+            log.info("📂 Learning blocks loaded from: %s", filepath)
             return blocks_data
         except Exception as e:
-            print(f"❌ Error loading blocks from {filepath}: {e}")
+            log.error("❌ Error loading blocks from %s: %s", filepath, e)
             return {}
 
 
@@ -1,21 +1,50 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
-import uvicorn
-from datetime import datetime
-import json
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from collections import OrderedDict
+import anyio
+import asyncio
+from datetime import datetime, timezone
+import hashlib
+import logging
+import orjson
 import os
+import re
+import time
+import uuid
+from batching import InFlightCoalescer
+from cache import DiskCache, make_key
 from learning_blocks import learning_processor, LearningBlock
 from prompts import PROMPTS
-from agent import learner_agent
+from agent import get_learner_agent
+from configs import config
+
+
+log = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the notebooks directory, set up logging and warm the LLM client at startup (config is validated on import)"""
+    os.makedirs(NOTEBOOKS_ROOT, exist_ok=True)
+    logging.basicConfig(level=config.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Build the LLM client now so the first request doesn't pay for its imports and setup
+    get_learner_agent()
+    yield
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="HopHacks 2025 Learner API",
     description="AI-powered learning assistant API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -27,6 +56,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress the JSON responses (learning blocks, notebooks), which are mostly text; videos are
+# already compressed and served by byte range, and NDJSON streams must not be held back
+_GZIP_EXCLUDED_PREFIXES = ("/visualization/", "/learn/stream")
+
+
+class _SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that skips the paths in _GZIP_EXCLUDED_PREFIXES"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(_GZIP_EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(_SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Pydantic models
 class LearnRequest(BaseModel):
     topic: str  # Single topic to break down into components
@@ -45,86 +91,215 @@ class LearnResponse(BaseModel):
     components: List[str]  # List of component subtopics
     timestamp: datetime
 
+# Complete /learn responses keyed by _learn_cache_key, least recently used first
+_learn_cache: "OrderedDict[str, LearnResponse]" = OrderedDict()
+# Disk tier so cached responses survive restarts and are shared by all workers
+_learn_disk_cache = (
+    DiskCache(os.path.join("cache", "learn"), ttl=config.RESPONSE_DISK_CACHE_TTL,
+              max_entries=config.DISK_CACHE_MAX_ENTRIES)
+    if config.RESPONSE_DISK_CACHE_TTL > 0 else None
+)
+# playground_path reported when the notebook couldn't be created
+_NOTEBOOK_ERROR_PATH = "error_creating_notebook.ipynb"
+
+# Concurrent /learn requests for the same topic breakdown share one notebook generation call
+_notebook_inflight = InFlightCoalescer()
+
+# Anything but letters, digits, ' ', '-' and '_' (\w is exactly str.isalnum() plus '_')
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w \-]')
+
+# Strings (so braces inside them are skipped) and braces, for _clean_json_response's scan
+_JSON_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+# Generated playground notebooks are saved to and served from here
+NOTEBOOKS_ROOT = os.path.abspath("notebooks")
+
+# Visualizations are only ever served from inside this directory (symlinks resolved)
+VISUALIZATIONS_ROOT = os.path.realpath("visualizations")
+# Requested path -> (expiry, resolved path); realpath costs a syscall per path component
+_resolved_paths: Dict[str, Tuple[float, str]] = {}
+_RESOLVED_PATH_TTL = 60.0
+_RESOLVED_PATHS_MAX = 1024
+
+# Single-range "Range: bytes=start-end" header (either bound may be omitted)
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+_RANGE_CHUNK_SIZE = 64 * 1024
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "timestamp": datetime.now()
+        "timestamp": datetime.now(timezone.utc)
     }
 
 # Visualization endpoint
 @app.get("/visualization/{visualization_path:path}")
-async def get_visualization(visualization_path: str):
-    """Serve MP4 visualization files"""
-    # Construct the full path to the visualization file
-    full_path = os.path.join("visualizations", visualization_path)
-    
-    # Check if file exists
-    if not os.path.exists(full_path):
-        raise HTTPException(status_code=404, detail="Visualization file not found")
-    
+async def get_visualization(visualization_path: str, request: Request):
+    """Serve MP4 visualization files, honouring Range requests so players can seek"""
     # Check if it's an MP4 file
     if not visualization_path.lower().endswith('.mp4'):
         raise HTTPException(status_code=400, detail="File is not an MP4 video")
     
-    # Return the file
+    # Resolve the full path, refusing anything outside the visualizations directory
+    full_path = _resolve_visualization_path(visualization_path)
+    
+    # Check if file exists (a single stat, reused for the response headers)
+    try:
+        stat_result = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Visualization file not found")
+    
+    range_header = request.headers.get("range")
+    if range_header:
+        range_response = _range_response(full_path, range_header, stat_result.st_size)
+        if range_response is not None:
+            return range_response
+    
+    # Return the whole file (also used for Range headers we don't support, e.g. multiple ranges)
     return FileResponse(
         path=full_path,
         media_type="video/mp4",
-        filename=os.path.basename(visualization_path)
+        filename=os.path.basename(visualization_path),
+        stat_result=stat_result,
+        headers={"Accept-Ranges": "bytes"}
+    )
+
+def _resolve_visualization_path(visualization_path: str) -> str:
+    """Resolve a requested path inside VISUALIZATIONS_ROOT, caching the resolution for a short while"""
+    now = time.monotonic()
+    cached = _resolved_paths.get(visualization_path)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    
+    full_path = os.path.realpath(os.path.join(VISUALIZATIONS_ROOT, visualization_path))
+    if os.path.commonpath([VISUALIZATIONS_ROOT, full_path]) != VISUALIZATIONS_ROOT:
+        raise HTTPException(status_code=400, detail="Invalid visualization path")
+    
+    if len(_resolved_paths) >= _RESOLVED_PATHS_MAX:
+        _resolved_paths.clear()
+    _resolved_paths[visualization_path] = (now + _RESOLVED_PATH_TTL, full_path)
+    return full_path
+
+def _range_response(full_path: str, range_header: str, file_size: int) -> Optional[Response]:
+    """
+    Build a 206 response for a single 'bytes=start-end' range, or 416 if it can't be satisfied.
+    Returns None for headers we don't handle, so the caller can ignore them and send the whole file.
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), file_size - 1) if match.group(2) else file_size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(file_size - int(match.group(2)), 0)
+        end = file_size - 1
+    
+    if start >= file_size or start > end:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+    
+    async def read_range():
+        async with await anyio.open_file(full_path, "rb") as f:
+            await f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await f.read(min(_RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    return StreamingResponse(
+        read_range(),
+        status_code=206,
+        media_type="video/mp4",
+        headers={
+            "Content-Range": f"bytes {start}-{end}/{file_size}",
+            "Content-Length": str(end - start + 1),
+            "Accept-Ranges": "bytes"
+        }
     )
 
 # Learning endpoint
 @app.post("/learn", response_model=LearnResponse)
-async def learn(request: LearnRequest):
+async def learn(request: LearnRequest, background_tasks: BackgroundTasks):
     """Get a learning response from the AI agent using the new topic breakdown approach"""
     try:
-        print(f"📚 Processing learning request with topic: {request.topic}")
+        log.info("📚 Processing learning request with topic: %s", request.topic)
         
-        # Process single topic by breaking it down into components
-        learning_blocks = await learning_processor.process_single_topic(request.topic, request.user_preferences)
+        cache_key = _learn_cache_key(request.topic, request.user_preferences)
+        cached_response = _get_cached_learn_response(cache_key)
+        if cached_response is not None:
+            log.info("💾 Using cached learning response for topic: %s", request.topic)
+            return cached_response.model_copy(update={"main_topic": request.topic, "timestamp": datetime.now(timezone.utc)})
         
-        if not learning_blocks:
+        # Break the topic down first so the notebook can be generated while the blocks are processed
+        components, needs_visualization = await learning_processor.break_down_topic_with_viz_flags(request.topic)
+        
+        if not components:
             raise HTTPException(status_code=400, detail="No learning components could be generated for this topic")
         
-        # Check if too many components failed (more than 50% failed)
-        # Count as failed if there's no text content AND no visualization (complete failure)
-        failed_components = sum(1 for block in learning_blocks if not block.text_content.strip() and not block.visualization_path)
-        total_components = len(learning_blocks)
+        # The notebook only depends on the component topics, so start it now and hide its LLM
+        # round trip behind the (much slower) per-component text and visualization generation
+        playground_task = asyncio.create_task(_create_playground_with_llm(components, request.topic))
+        
+        # Blocks are logged to disk as they finish and consolidated by save_blocks
+        session_id = f"session_{uuid.uuid4().hex[:12]}"
         
-        # Debug: Print details about each block
-        print(f"🔍 Component status summary:")
-        for i, block in enumerate(learning_blocks):
-            has_text = bool(block.text_content.strip())
-            has_viz = bool(block.visualization_path)
-            status = "✅ OK" if (has_text or has_viz) else "❌ FAILED"
-            print(f"  Component {i+1}: {block.topic} - Text: {has_text}, Viz: {has_viz} - {status}")
+        # Count as failed if generating the component raised (the block only holds the error).
+        # Failures are counted as components finish so a request that can no longer succeed
+        # (more than 50% failed) stops right away instead of waiting for the remaining components
+        learning_blocks = []
+        failed_components = 0
+        total_components = len(components)
+        block_stream = learning_processor.stream_blocks(
+            components, request.user_preferences, needs_visualization, session_id
+        )
+        try:
+            async for block in block_stream:
+                learning_blocks.append(block)
+                log.debug("  Component %s: %s - Text: %s, Viz: %s - %s", block.id, block.topic,
+                          bool(block.text_content.strip()), bool(block.visualization_path),
+                          "❌ FAILED" if block.failed else "✅ OK")
+                if block.failed:
+                    failed_components += 1
+                    if failed_components > total_components * 0.5:
+                        break
+        except Exception:
+            playground_task.cancel()
+            learning_processor.discard_session_log(session_id)
+            raise
+        finally:
+            # Cancels any components still in progress
+            await block_stream.aclose()
+        learning_blocks.sort(key=lambda block: block.id)
         
         if failed_components > total_components * 0.5:
+            playground_task.cancel()
+            learning_processor.discard_session_log(session_id)
             raise HTTPException(
                 status_code=500, 
                 detail=f"Too many components failed to generate content ({failed_components}/{total_components}). Please try a different topic or check the system logs."
             )
         
-        # Extract components list from blocks
-        components = [block.topic for block in learning_blocks]
+        log.info("📋 Generated %s learning blocks from topic: %s", len(learning_blocks), request.topic)
+        log.info("🔧 Components: %s", components)
         
-        print(f"📋 Generated {len(learning_blocks)} learning blocks from topic: {request.topic}")
-        print(f"🔧 Components: {components}")
-        
-        # Save blocks to file for future reference
-        blocks_file = learning_processor.save_blocks(learning_blocks)
-        print(f"💾 Learning blocks saved to: {blocks_file}")
+        # Save blocks to file for future reference; the file isn't part of the response, so
+        # write it in the threadpool after the response is sent instead of blocking the event loop
+        background_tasks.add_task(learning_processor.save_blocks, learning_blocks, session_id=session_id)
         
         # Create playground from learning blocks and save as .ipynb file
         try:
-            playground = await _create_playground_with_llm(learning_blocks, request.topic)
-            playground_path = _save_playground_as_notebook(playground, request.topic)
-            print(f"✅ Playground created and saved: {playground_path}")
+            playground = await playground_task
+            playground_path = await _save_playground_as_notebook(playground, request.topic)
+            log.info("✅ Playground created and saved: %s", playground_path)
         except Exception as e:
-            print(f"❌ Error creating playground: {str(e)}")
-            playground_path = "error_creating_notebook.ipynb"
+            log.error("❌ Error creating playground: %s", e)
+            playground_path = _NOTEBOOK_ERROR_PATH
         
         # Convert blocks to response format
         block_responses = [
@@ -137,26 +312,183 @@ async def learn(request: LearnRequest):
             for block in learning_blocks
         ]
         
-        return LearnResponse(
+        response = LearnResponse(
             learning_blocks=block_responses,
             playground_path=playground_path,
             main_topic=request.topic,
             components=components,
-            timestamp=datetime.now()
+            timestamp=datetime.now(timezone.utc)
         )
         
+        # Only cache complete results: a notebook was generated and every block is complete
+        # (no errors, no visualization that was wanted but failed)
+        if playground_path != _NOTEBOOK_ERROR_PATH and all(block.complete for block in learning_blocks):
+            _store_cached_learn_response(cache_key, response)
+        
+        return response
+        
     except Exception as e:
-        print(f"❌ Error in learn endpoint: {str(e)}")
+        log.error("❌ Error in learn endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
-async def _create_playground_with_llm(learning_blocks: List[LearningBlock], main_topic: str) -> Dict[str, Any]:
-    """Create a Jupyter notebook using LLM to generate the complete JSON structure"""
+@app.post("/learn/stream")
+async def learn_stream(request: LearnRequest):
+    """
+    Like /learn, but streams newline-delimited JSON events as the work finishes:
+    {"type": "components"}, then one {"type": "block"} per learning block in completion
+    order, then {"type": "notebook"} and {"type": "done"}, or {"type": "error"} if it fails.
+    """
+    try:
+        log.info("📚 Streaming learning request with topic: %s", request.topic)
+        components, needs_visualization = await learning_processor.break_down_topic_with_viz_flags(request.topic)
+    except Exception as e:
+        log.error("❌ Error in learn stream endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    
+    if not components:
+        raise HTTPException(status_code=400, detail="No learning components could be generated for this topic")
+    
+    # Blocks are logged to disk as they finish and consolidated by save_blocks once the stream ends
+    session_id = f"session_{uuid.uuid4().hex[:12]}"
+    learning_blocks: List[LearningBlock] = []
+    return StreamingResponse(
+        _learn_events(request, components, needs_visualization, session_id, learning_blocks),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(_save_stream_blocks, learning_blocks, session_id)
+    )
+
+
+def _save_stream_blocks(learning_blocks: List[LearningBlock], session_id: str):
+    """Save a finished stream's blocks; a stream that failed has cleared them, so nothing is written"""
+    if learning_blocks:
+        learning_processor.save_blocks(learning_blocks, session_id=session_id)
+
+
+async def _learn_events(request: LearnRequest, components: List[str], needs_visualization: Optional[List[bool]],
+                        session_id: str, learning_blocks: List[LearningBlock]) -> AsyncIterator[bytes]:
+    """Generate the /learn/stream events, collecting the finished blocks into learning_blocks"""
+    yield _ndjson_line({"type": "components", "main_topic": request.topic, "components": components})
+    
+    playground_task = asyncio.create_task(_create_playground_with_llm(components, request.topic))
+    failed_components = 0
+    block_stream = learning_processor.stream_blocks(
+        components, request.user_preferences, needs_visualization, session_id
+    )
+    try:
+        async for block in block_stream:
+            learning_blocks.append(block)
+            yield _ndjson_line({"type": "block", "block": block.to_dict()})
+            
+            if block.failed:
+                failed_components += 1
+                if failed_components > len(components) * 0.5:
+                    yield _ndjson_line({
+                        "type": "error",
+                        "detail": f"Too many components failed to generate content ({failed_components}/{len(components)}). Please try a different topic or check the system logs."
+                    })
+                    _discard_stream_session(session_id, learning_blocks)
+                    return
+        
+        try:
+            playground = await playground_task
+            playground_path = await _save_playground_as_notebook(playground, request.topic)
+            log.info("✅ Playground created and saved: %s", playground_path)
+        except Exception as e:
+            log.error("❌ Error creating playground: %s", e)
+            playground_path = _NOTEBOOK_ERROR_PATH
+        yield _ndjson_line({"type": "notebook", "playground_path": playground_path})
+        yield _ndjson_line({"type": "done", "timestamp": datetime.now(timezone.utc)})
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client went away, so the response's save_blocks background task won't run
+        learning_processor.discard_session_log(session_id)
+        raise
+    except Exception as e:
+        log.error("❌ Error in learn stream endpoint: %s", e)
+        _discard_stream_session(session_id, learning_blocks)
+        yield _ndjson_line({"type": "error", "detail": f"Error processing request: {str(e)}"})
+    finally:
+        # Runs on errors, early aborts and client disconnects alike
+        playground_task.cancel()
+        await block_stream.aclose()
+
+
+def _discard_stream_session(session_id: str, learning_blocks: List[LearningBlock]):
+    """Drop a failed stream's session log and blocks so the background save has nothing to persist, as /learn does"""
+    learning_processor.discard_session_log(session_id)
+    learning_blocks.clear()
+
+
+def _ndjson_line(event: Dict[str, Any]) -> bytes:
+    """Serialize one /learn/stream event"""
+    return orjson.dumps(event) + b"\n"
+
+
+def _learn_cache_key(topic: str, user_preferences: str) -> str:
+    """Cache key for a /learn request: case- and surrounding-whitespace-insensitive"""
+    key = f"{topic.strip().lower()}\0{user_preferences.strip().lower()}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _get_cached_learn_response(key: str) -> Optional["LearnResponse"]:
+    """Look up a /learn response in memory, then on disk (promoting disk hits into memory)"""
+    response = _learn_cache.get(key)
+    if response is not None:
+        _learn_cache.move_to_end(key)
+        return response
     
-    print(f"🤖 Generating notebook with LLM for topic: {main_topic}")
+    if _learn_disk_cache is None:
+        return None
+    stored = _learn_disk_cache.get(make_key(config.GEMINI_MODEL, key))
+    if stored is None:
+        return None
+    try:
+        response = LearnResponse.model_validate(stored)
+    except ValidationError:
+        return None
+    # The notebook or a video may have been cleaned up since the response was stored
+    if not _learn_response_files_exist(response):
+        return None
+    _store_cached_learn_response(key, response, persist=False)
+    return response
+
+
+def _store_cached_learn_response(key: str, response: "LearnResponse", persist: bool = True):
+    """Cache a /learn response in memory (evicting the least recently used entry when full) and on disk"""
+    if persist and _learn_disk_cache is not None:
+        _learn_disk_cache.set(make_key(config.GEMINI_MODEL, key), response.model_dump(mode="json"))
     
-    # Extract component topics
-    component_topics = [block.topic for block in learning_blocks]
+    if config.LEARN_CACHE_SIZE <= 0:
+        return
+    _learn_cache[key] = response
+    _learn_cache.move_to_end(key)
+    while len(_learn_cache) > config.LEARN_CACHE_SIZE:
+        _learn_cache.popitem(last=False)
+
+
+def _learn_response_files_exist(response: "LearnResponse") -> bool:
+    """Whether the notebook and every video a cached response points to are still on disk"""
+    if not os.path.isfile(os.path.join(NOTEBOOKS_ROOT, response.playground_path)):
+        return False
+    return all(
+        os.path.isfile(os.path.join(VISUALIZATIONS_ROOT, block.visualization_path))
+        for block in response.learning_blocks
+        if block.visualization_path
+    )
+
+
+async def _create_playground_with_llm(component_topics: List[str], main_topic: str) -> Dict[str, Any]:
+    """Create a Jupyter notebook using LLM, sharing the call with identical concurrent requests"""
+    return await _notebook_inflight.run(
+        (main_topic, tuple(component_topics)),
+        lambda: _generate_playground_with_llm(component_topics, main_topic)
+    )
+
+
+async def _generate_playground_with_llm(component_topics: List[str], main_topic: str) -> Dict[str, Any]:
+    """Create a Jupyter notebook using LLM to generate the complete JSON structure"""
+    
+    log.info("🤖 Generating notebook with LLM for topic: %s", main_topic)
     
     # Create prompt for notebook generation
     notebook_prompt = PROMPTS["notebook_creator"]
@@ -173,184 +505,139 @@ For each component topic, create:
 
 Make it educational and hands-on with real Python code examples."""
     
+    messages = [{"role": "user", "content": user_message}]
     try:
         # Generate notebook JSON using LLM with timeout handling
-        import asyncio
         try:
             notebook_json = await asyncio.wait_for(
-                learner_agent.get_response(
-                    notebook_prompt,
-                    [{"role": "user", "content": user_message}],
-                    tools=None
-                ),
+                get_learner_agent().get_response(notebook_prompt, messages, tools=None, cache=True),
                 timeout=30.0  # 30 second timeout
             )
         except asyncio.TimeoutError:
-            print(f"⏰ LLM timeout for notebook generation, using ultra-simple fallback")
-            component_topics = [block.topic for block in learning_blocks]
+            log.warning("⏰ LLM timeout for notebook generation, using ultra-simple fallback")
             return _create_ultra_simple_notebook(component_topics, main_topic)
         
-        print(f"🔍 Raw LLM response length: {len(notebook_json)} characters")
+        log.debug("🔍 Raw LLM response length: %s characters", len(notebook_json))
         
         # Clean the response to extract pure JSON
         cleaned_json = _clean_json_response(notebook_json)
         
-        # Parse the JSON response
+        # Parse the JSON response; the LLM only writes the cells, the envelope is added here
         try:
-            notebook = json.loads(cleaned_json)
-            print(f"✅ Successfully parsed notebook JSON with {len(notebook.get('cells', []))} cells")
-            return notebook
-        except json.JSONDecodeError as e:
-            print(f"❌ Failed to parse JSON: {e}")
-            print(f"🔍 Raw response: {notebook_json[:500]}...")
-            print(f"🔍 Cleaned response: {cleaned_json[:500]}...")
+            cells = _cells_from_llm(orjson.loads(cleaned_json))
+            if not cells:
+                log.warning("⚠️ LLM returned no usable cells for topic: %s", main_topic)
+                return _create_ultra_simple_notebook(component_topics, main_topic)
+            log.info("✅ Successfully parsed notebook JSON with %s cells", len(cells))
+            get_learner_agent().store_response(notebook_prompt, messages, notebook_json)
+            return {
+                "cells": cells,
+                "metadata": _NOTEBOOK_METADATA,
+                "nbformat": 4,
+                "nbformat_minor": 4
+            }
+        except orjson.JSONDecodeError as e:
+            log.error("❌ Failed to parse JSON: %s", e)
+            log.debug("🔍 Raw response: %s...", notebook_json[:500])
+            log.debug("🔍 Cleaned response: %s...", cleaned_json[:500])
             # Fallback to ultra-simple notebook structure
-            component_topics = [block.topic for block in learning_blocks]
             return _create_ultra_simple_notebook(component_topics, main_topic)
             
     except Exception as e:
-        print(f"❌ Error generating notebook with LLM: {str(e)}")
+        log.error("❌ Error generating notebook with LLM: %s", e)
         # Fallback to ultra-simple notebook structure
-        component_topics = [block.topic for block in learning_blocks]
         return _create_ultra_simple_notebook(component_topics, main_topic)
 
 
 def _clean_json_response(response: str) -> str:
-    """Clean LLM response to extract pure JSON"""
-    response = response.strip()
-    
-    # Remove markdown code blocks
-    if response.startswith("```json"):
-        response = response[7:]  # Remove ```json
-    elif response.startswith("```"):
-        response = response[3:]  # Remove ```
-    
-    if response.endswith("```"):
-        response = response[:-3]  # Remove trailing ```
-    
-    # Find the first { and last } to extract JSON
+    """
+    Clean LLM response to extract pure JSON: the first {...} object with its matching
+    closing brace, skipping markdown fences and any text around it. Braces inside
+    JSON strings are ignored.
+    """
     start_idx = response.find('{')
-    end_idx = response.rfind('}')
+    if start_idx == -1:
+        return response.strip()
     
-    if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-        response = response[start_idx:end_idx + 1]
+    depth = 0
+    for match in _JSON_TOKEN_RE.finditer(response, start_idx):
+        token = match.group()
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                return response[start_idx:match.end()]
     
-    return response.strip()
-
-
-def _create_simple_fallback_notebook(learning_blocks: List[LearningBlock], main_topic: str) -> Dict[str, Any]:
-    """Create a simple fallback notebook if LLM generation fails"""
+    # Unbalanced (e.g. a truncated reply): fall back to the last closing brace
+    end_idx = response.rfind('}')
+    if end_idx > start_idx:
+        return response[start_idx:end_idx + 1]
+    return response[start_idx:].strip()
+
+
+# Constant parts of the LLM and ultra-simple fallback notebooks. Notebooks built from them share
+# these dicts, which is fine because notebooks are only ever serialized, never modified
+_NOTEBOOK_METADATA = {
+    "kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"},
+    "language_info": {"name": "python", "version": "3.8.0"}
+}
+_MARKDOWN_CELL_TEMPLATE = {"cell_type": "markdown", "source": None, "metadata": {}}
+_CODE_CELL_TEMPLATE = {
+    "cell_type": "code",
+    "source": None,
+    "metadata": {"execution_count": None, "outputs": []},
+    "execution_count": None,
+    "outputs": []
+}
+
+
+def _cells_from_llm(data: Any) -> List[Dict[str, Any]]:
+    """Turn the LLM's {"cells": [{"type": ..., "source": ...}]} reply into notebook cells, skipping malformed ones"""
+    raw_cells = data.get("cells") if isinstance(data, dict) else None
+    if not isinstance(raw_cells, list):
+        log.warning("❌ LLM notebook reply has no cells list")
+        return []
     
     cells = []
-    
-    # Add introduction cell
-    cells.append({
-        "cell_type": "markdown",
-        "source": [f"# {main_topic}\n\nThis notebook contains learning components for the following topics:\n\n" + 
-                  "\n".join([f"- {block.topic}" for block in learning_blocks])],
-        "metadata": {}
-    })
-    
-    # Add a cell for each learning block
-    for block in learning_blocks:
-        # Markdown cell with component and content
-        cells.append({
-            "cell_type": "markdown",
-            "source": [f"## {block.topic}\n\n{block.text_content}"],
-            "metadata": {}
-        })
-        
-        # Simple code cell with basic template
-        code_template = f"""# Exercise: {block.topic}
-# Implement your solution here based on the learning content above
-
-# TODO: Add your code here
-def solve_problem():
-    # Your code here
-    pass
-
-# Test your solution
-# result = solve_problem()
-# print(f"Result: {{result}}")"""
-        
-        cells.append({
-            "cell_type": "code",
-            "source": [code_template],
-            "metadata": {
-                "execution_count": None,
-                "outputs": []
-            },
-            "execution_count": None,
-            "outputs": []
-        })
-    
-    # Create proper IPython notebook structure
-    notebook = {
-        "cells": cells,
-        "metadata": {
-            "kernelspec": {
-                "display_name": "Python 3",
-                "language": "python",
-                "name": "python3"
-            },
-            "language_info": {
-                "codemirror_mode": {
-                    "name": "ipython",
-                    "version": 3
-                },
-                "file_extension": ".py",
-                "mimetype": "text/x-python",
-                "name": "python",
-                "nbconvert_exporter": "python",
-                "pygments_lexer": "ipython3",
-                "version": "3.8.0"
-            },
-            "orig_nbformat": 4
-        },
-        "nbformat": 4,
-        "nbformat_minor": 4
-    }
-    
-    return notebook
+    for i, raw in enumerate(raw_cells):
+        if not isinstance(raw, dict) or not isinstance(raw.get("source"), (str, list)):
+            log.warning("❌ Cell %s is malformed, skipping it", i)
+            continue
+        template = _CODE_CELL_TEMPLATE if raw.get("type") == "code" else _MARKDOWN_CELL_TEMPLATE
+        source = raw["source"]
+        cells.append({**template, "source": [source] if isinstance(source, str) else source})
+    return cells
 
 
 def _create_ultra_simple_notebook(component_topics: List[str], main_topic: str) -> Dict[str, Any]:
     """Create an ultra-simple notebook without LLM calls for maximum reliability"""
     
-    cells = []
-    
-    # Add introduction cell
-    cells.append({
-        "cell_type": "markdown",
-        "source": [f"# {main_topic}\n\nLearning notebook covering these topics:\n\n" + 
-                  "\n".join([f"- {topic}" for topic in component_topics])],
-        "metadata": {}
-    })
+    # One pass over the topics fills both the per-topic cells and the introduction's topic list
+    cells = [None] * (1 + 2 * len(component_topics))
+    topic_lines = []
     
-    # Add a simple cell for each topic
+    # Add a markdown and a code cell for each topic
     for i, topic in enumerate(component_topics, 1):
-        # Markdown cell
-        cells.append({
-            "cell_type": "markdown",
-            "source": [f"## {i}. {topic}\n\nLearn about {topic.lower()} concepts and implementation."],
-            "metadata": {}
-        })
-        
-        # Code cell
-        cells.append({
-            "cell_type": "code",
-            "source": [f"# {topic} Exercise\n# Add your code here\n\nprint('Working on {topic}')"],
-            "metadata": {"execution_count": None, "outputs": []},
-            "execution_count": None,
-            "outputs": []
-        })
+        topic_lines.append(f"- {topic}")
+        cells[2 * i - 1] = {
+            **_MARKDOWN_CELL_TEMPLATE,
+            "source": [f"## {i}. {topic}\n\nLearn about {topic.lower()} concepts and implementation."]
+        }
+        cells[2 * i] = {
+            **_CODE_CELL_TEMPLATE,
+            "source": [f"# {topic} Exercise\n# Add your code here\n\nprint('Working on {topic}')"]
+        }
+    
+    # Add introduction cell
+    cells[0] = {
+        **_MARKDOWN_CELL_TEMPLATE,
+        "source": [f"# {main_topic}\n\nLearning notebook covering these topics:\n\n" + "\n".join(topic_lines)]
+    }
     
     return {
         "cells": cells,
-        "metadata": {
-            "kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"},
-            "language_info": {"name": "python", "version": "3.8.0"}
-        },
+        "metadata": _NOTEBOOK_METADATA,
         "nbformat": 4,
         "nbformat_minor": 4
     }
@@ -358,101 +645,55 @@ def _create_ultra_simple_notebook(component_topics: List[str], main_topic: str)
 
 
 
-def _save_playground_as_notebook(playground: Dict[str, Any], topic: str) -> str:
+async def _save_playground_as_notebook(playground: Dict[str, Any], topic: str) -> str:
     """Save playground as proper .ipynb file and return the relative path"""
-    # Create notebooks directory if it doesn't exist
-    notebooks_dir = "notebooks"
-    if not os.path.exists(notebooks_dir):
-        os.makedirs(notebooks_dir)
-    
     # Generate filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    safe_topic = safe_topic.replace(' ', '_')
+    safe_topic = _UNSAFE_FILENAME_CHARS_RE.sub('', topic).rstrip().replace(' ', '_')
     filename = f"playground_{safe_topic}_{timestamp}.ipynb"
-    filepath = os.path.join(notebooks_dir, filename)
-    
-    # Validate notebook structure before saving
-    if not _validate_notebook_structure(playground):
-        print(f"⚠️ Warning: Notebook structure validation failed for {filename}")
+    filepath = os.path.join(NOTEBOOKS_ROOT, filename)
     
-    # Save the notebook with proper formatting
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(playground, f, indent=2, ensure_ascii=False)
+    # Save the notebook with proper formatting; serializing and writing a large notebook
+    # would stall every other request, so it happens in a worker thread
+    await asyncio.to_thread(_write_notebook, filepath, playground)
     
-    print(f"📓 IPython notebook saved: {filepath}")
-    print(f"📊 Notebook contains {len(playground.get('cells', []))} cells")
+    log.info("📓 IPython notebook saved: %s", filepath)
+    log.info("📊 Notebook contains %s cells", len(playground.get('cells', [])))
     return filename  # Return just the filename for the API response
 
 
-def _validate_notebook_structure(notebook: Dict[str, Any]) -> bool:
-    """Validate that the notebook has proper IPython structure"""
-    try:
-        # Check required top-level keys
-        required_keys = ['cells', 'metadata', 'nbformat', 'nbformat_minor']
-        if not all(key in notebook for key in required_keys):
-            print(f"❌ Missing required keys: {[k for k in required_keys if k not in notebook]}")
-            return False
-        
-        # Check nbformat version
-        if notebook.get('nbformat') != 4:
-            print(f"❌ Invalid nbformat version: {notebook.get('nbformat')}")
-            return False
-        
-        # Check cells structure
-        cells = notebook.get('cells', [])
-        if not isinstance(cells, list):
-            print("❌ Cells must be a list")
-            return False
-        
-        for i, cell in enumerate(cells):
-            if not isinstance(cell, dict):
-                print(f"❌ Cell {i} is not a dictionary")
-                return False
-            
-            if 'cell_type' not in cell:
-                print(f"❌ Cell {i} missing cell_type")
-                return False
-            
-            if cell['cell_type'] not in ['markdown', 'code', 'raw']:
-                print(f"❌ Cell {i} has invalid cell_type: {cell['cell_type']}")
-                return False
-        
-        # Check metadata structure
-        metadata = notebook.get('metadata', {})
-        if 'kernelspec' not in metadata:
-            print("⚠️ Missing kernelspec in metadata")
-        
-        print("✅ Notebook structure validation passed")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error validating notebook structure: {e}")
-        return False
+def _write_notebook(filepath: str, playground: Dict[str, Any]):
+    """Write a notebook as indented JSON"""
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(playground, option=orjson.OPT_INDENT_2))
 
 
 # Notebook endpoint
 @app.get("/notebook/{filename}")
 async def get_notebook(filename: str):
     """Serve .ipynb notebook files"""
-    # Construct the full path to the notebook file
-    full_path = os.path.join("notebooks", filename)
-    
-    # Check if file exists
-    if not os.path.exists(full_path):
-        raise HTTPException(status_code=404, detail="Notebook file not found")
-    
     # Check if it's an .ipynb file
     if not filename.lower().endswith('.ipynb'):
         raise HTTPException(status_code=400, detail="File is not a Jupyter notebook")
     
+    # Construct the full path to the notebook file
+    full_path = os.path.join(NOTEBOOKS_ROOT, filename)
+    
+    # Check if file exists (a single stat, reused by FileResponse instead of its own)
+    try:
+        stat_result = os.stat(full_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Notebook file not found")
+    
     # Return the file
     return FileResponse(
         path=full_path,
         media_type="application/json",
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from run_prod import run
+    run()
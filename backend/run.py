@@ -2,17 +2,23 @@
 """
 Development server runner for the FastAPI application.
 Run this file to start the development server.
+Pass --bench to run without the file watcher (e.g. when benchmarking).
 """
 
+import sys
 import uvicorn
 from main import app
 
 if __name__ == "__main__":
+    reload = "--bench" not in sys.argv
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,  # Enable auto-reload for development
-        reload_excludes=["visualizations/*", "**/visualizations/**"],  # Exclude visualizations folder
+        reload=reload,  # Enable auto-reload for development
+        # Only Python sources trigger a reload; generated videos, notebooks and cache files are ignored
+        reload_dirs=["."] if reload else None,
+        reload_includes=["*.py"] if reload else None,
+        reload_excludes=["visualizations/*", "**/visualizations/**", "notebooks/*", "cache/*", "*.mp4", "*.ipynb"] if reload else None,
         log_level="info"
     )
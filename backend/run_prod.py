@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Production server runner for the FastAPI application.
+Runs several worker processes on uvloop + httptools without auto-reload.
+"""
+
+import uvicorn
+from configs import config
+
+
+def run():
+    # Each worker is a separate process with its own in-memory caches; the disk caches are shared
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=config.WORKERS,
+        loop="uvloop",
+        http="httptools",
+        # Shed load with 503s instead of queueing without bound, and keep idle
+        # connections open long enough for the frontend's follow-up video requests
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -3,14 +3,43 @@
 Simple test script to hit the /learn endpoint and save the playground as an .ipynb file
 """
 
-import requests
+import asyncio
 import json
-from datetime import datetime
+import sys
+import httpx
 
-def main():
+# BASE_URL = "http://localhost:8000"
+BASE_URL = "https://hophacks-learnwiz-backend.sliplane.app"
+
+
+async def check_notebook(client: httpx.AsyncClient, playground_path: str):
+    """Fetch the generated notebook and report its cell count"""
+    notebook_url = f"{BASE_URL}/notebook/{playground_path}"
+    print(f"\n📓 Testing notebook endpoint: {notebook_url}")
+    
+    notebook_response = await client.get(notebook_url)
+    if notebook_response.status_code == 200:
+        notebook_data = notebook_response.json()
+        print(f"✅ Notebook endpoint working! ({len(notebook_data.get('cells', []))} cells)")
+    else:
+        print(f"❌ Notebook endpoint failed: {notebook_response.status_code}")
+
+
+async def check_visualization(client: httpx.AsyncClient, visualization_path: str):
+    """Fetch one visualization video and report its size"""
+    viz_url = f"{BASE_URL}/visualization/{visualization_path}"
+    print(f"\n🎥 Testing visualization endpoint: {viz_url}")
+    
+    viz_response = await client.get(viz_url)
+    if viz_response.status_code == 200:
+        print(f"✅ Visualization endpoint working! ({len(viz_response.content)} bytes)")
+    else:
+        print(f"❌ Visualization endpoint failed: {viz_response.status_code}")
+
+
+async def main():
     # API endpoint
-    # url = "http://localhost:8000/learn"
-    url = "https://hophacks-learnwiz-backend.sliplane.app/learn"
+    url = f"{BASE_URL}/learn"
     
     # Request payload
     payload = {
@@ -24,64 +53,103 @@ def main():
     print("-" * 50)
     
     try:
-        # Make the request
-        response = requests.post(url, json=payload, timeout=300)
-        
-        if response.status_code == 200:
-            data = response.json()
+        async with httpx.AsyncClient(timeout=300) as client:
+            # Make the request
+            response = await client.post(url, json=payload)
             
-            print("✅ Request successful!")
-            print(f"Main topic: {data['main_topic']}")
-            print(f"Components: {data['components']}")
-            print(f"Number of learning blocks: {len(data['learning_blocks'])}")
-            print(f"Notebook path: {data['playground_path']}")
-            
-            # Test notebook endpoint
-            notebook_url = f"https://hophacks-learnwiz-backend.sliplane.app/notebook/{data['playground_path']}"
-            print(f"\n📓 Testing notebook endpoint: {notebook_url}")
+            if response.status_code == 200:
+                data = response.json()
+                
+                # Build the whole summary first and write it in one go
+                lines = [
+                    "✅ Request successful!",
+                    f"Main topic: {data['main_topic']}",
+                    f"Components: {data['components']}",
+                    f"Number of learning blocks: {len(data['learning_blocks'])}",
+                    f"Notebook path: {data['playground_path']}",
+                    "\n📚 Learning Blocks:"
+                ]
+                for block in data['learning_blocks']:
+                    lines.append(f"  Block {block['id']}: {block['topic']}")
+                    lines.append(f"    Content: {len(block['text_content'])} characters")
+                    if block['visualization_path']:
+                        lines.append(f"    🎥 Visualization: {block['visualization_path']}")
+                    else:
+                        lines.append(f"    ℹ️  No visualization")
+                print("\n".join(lines))
+                
+                # Test the notebook endpoint and every visualization concurrently
+                await asyncio.gather(
+                    check_notebook(client, data['playground_path']),
+                    *(
+                        check_visualization(client, block['visualization_path'])
+                        for block in data['learning_blocks']
+                        if block['visualization_path']
+                    )
+                )
+                
+                print("🎉 Test completed successfully!")
             
-            notebook_response = requests.get(notebook_url)
-            if notebook_response.status_code == 200:
-                notebook_data = notebook_response.json()
-                print(f"✅ Notebook endpoint working! ({len(notebook_data.get('cells', []))} cells)")
             else:
-                print(f"❌ Notebook endpoint failed: {notebook_response.status_code}")
-            
-            # Display learning blocks
-            print("\n📚 Learning Blocks:")
-            for block in data['learning_blocks']:
-                print(f"  Block {block['id']}: {block['topic']}")
-                print(f"    Content: {len(block['text_content'])} characters")
-                if block['visualization_path']:
-                    print(f"    🎥 Visualization: {block['visualization_path']}")
-                else:
-                    print(f"    ℹ️  No visualization")
-            
-            # Test visualization endpoint if we have a visualization
-            for block in data['learning_blocks']:
-                if block['visualization_path']:
-                    # viz_url = f"http://localhost:8000/visualization/{block['visualization_path']}"
-                    viz_url = f"https://hophacks-learnwiz-backend.sliplane.app/visualization/{block['visualization_path']}"
-                    print(f"\n🎥 Testing visualization endpoint: {viz_url}")
+                print(f"❌ Request failed with status code: {response.status_code}")
+                print(f"Response: {response.text}")
+    
+    except httpx.ConnectError:
+        print(f"❌ Connection error: Make sure the server is running on {BASE_URL}")
+        print("   Check your deployment and endpoint URL.")
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+
+async def main_stream():
+    """Like main, but uses /learn/stream and fetches each visualization as soon as its block arrives"""
+    url = f"{BASE_URL}/learn/stream"
+    payload = {
+        "topic": "linear functions",
+        "user_preferences": "I want to see visual examples"
+    }
+    
+    print(f"Testing streaming endpoint with topic: '{payload['topic']}'")
+    print(f"URL: {url}")
+    print("-" * 50)
+    
+    try:
+        async with httpx.AsyncClient(timeout=300) as client:
+            checks = []
+            async with client.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    print(f"❌ Request failed with status code: {response.status_code}")
+                    print(f"Response: {response.text}")
+                    return
+                
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
                     
-                    viz_response = requests.get(viz_url)
-                    if viz_response.status_code == 200:
-                        print(f"✅ Visualization endpoint working! ({len(viz_response.content)} bytes)")
-                    else:
-                        print(f"❌ Visualization endpoint failed: {viz_response.status_code}")
-                    break
+                    if event["type"] == "components":
+                        print(f"Components: {event['components']}")
+                    elif event["type"] == "block":
+                        block = event["block"]
+                        print(f"  Block {block['id']}: {block['topic']} ({len(block['text_content'])} characters)")
+                        if block['visualization_path']:
+                            # Download while the server is still generating the other blocks
+                            checks.append(asyncio.create_task(
+                                check_visualization(client, block['visualization_path'])
+                            ))
+                    elif event["type"] == "notebook":
+                        checks.append(asyncio.create_task(check_notebook(client, event['playground_path'])))
+                    elif event["type"] == "error":
+                        print(f"❌ Stream error: {event['detail']}")
             
+            await asyncio.gather(*checks)
             print("🎉 Test completed successfully!")
-            
-        else:
-            print(f"❌ Request failed with status code: {response.status_code}")
-            print(f"Response: {response.text}")
-            
-    except requests.exceptions.ConnectionError:
-        print("❌ Connection error: Make sure the server is running on https://hophacks-learnwiz-backend.sliplane.app")
-        print("   Check your deployment and endpoint URL.")
+    
+    except httpx.ConnectError:
+        print(f"❌ Connection error: Make sure the server is running on {BASE_URL}")
     except Exception as e:
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    # Pass --stream to exercise /learn/stream instead of /learn
+    asyncio.run(main_stream() if "--stream" in sys.argv else main())
@@ -1,39 +1,138 @@
 import asyncio
+import errno
+import hashlib
+import logging
 import subprocess
 import os
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
+from configs import config
+
+log = logging.getLogger(__name__)
+
+# Folder Manim renders -ql (480p, 15 fps) videos into, under <media_dir>/videos/<script stem>/
+_LOW_QUALITY_DIR = "480p15"
 
 class VisualizationTools:
     """Tools for generating educational visualizations"""
     
-    def __init__(self):
+    def __init__(self, manim_workers: Optional[int] = None):
         self.visualizations_dir = "visualizations"
+        self.video_cache_dir = os.path.join(self.visualizations_dir, "cache")
+        # Manim scripts are read once and deleted, so keep them in memory-backed /dev/shm when available
+        self.scripts_dir = "/dev/shm" if os.access("/dev/shm", os.W_OK) else self.visualizations_dir
+        # Manim + ffmpeg are CPU-bound; each render is its own process, so limit concurrent
+        # renders to manim_workers (default: config.MANIM_WORKERS) so they don't thrash
+        self.manim_workers = manim_workers or config.MANIM_WORKERS
+        self._render_semaphore = asyncio.Semaphore(self.manim_workers)
+        # Keep references to running cleanups so they aren't garbage collected mid-flight
+        self._cleanup_tasks = set()
         self._ensure_visualizations_dir()
     
     def _ensure_visualizations_dir(self):
         """Create visualizations directory if it doesn't exist"""
-        if not os.path.exists(self.visualizations_dir):
-            os.makedirs(self.visualizations_dir)
+        # makedirs creates visualizations/ along the way; exist_ok avoids a stat + mkdir race
+        os.makedirs(self.video_cache_dir, exist_ok=True)
+    
+    def _video_cache_path(self, manim_script: str, scene_name: str) -> str:
+        """Content-addressed cache path for a rendered script/scene pair"""
+        key = hashlib.sha256(f"{manim_script}\0{scene_name}".encode("utf-8")).hexdigest()
+        return os.path.join(self.video_cache_dir, f"{key}.mp4")
     
-    def _cleanup_temp_files(self, script_path: str):
-        """Clean up manim script file and media folder after processing"""
+    def _store_cached_video(self, rendered_path: str, cache_path: str):
+        """Atomically move a freshly rendered video into the cache"""
         try:
-            # Clean up the script file
-            if os.path.exists(script_path):
+            # media/ and the cache are both under visualizations/, so this is just a rename
+            os.replace(rendered_path, cache_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Different filesystems: copy next to the cache entry first so the final step stays atomic
+            import shutil
+            temp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.move(rendered_path, temp_path)
+            os.replace(temp_path, cache_path)
+        self._evict_video_cache()
+    
+    def _evict_video_cache(self):
+        """Remove least recently used cached videos once the cache exceeds its size cap"""
+        try:
+            entries = []
+            total_size = 0
+            with os.scandir(self.video_cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(".mp4"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_size += stat.st_size
+            
+            entries.sort()
+            for _, size, path in entries:
+                if total_size <= config.VIDEO_CACHE_MAX_BYTES:
+                    break
+                os.remove(path)
+                total_size -= size
+                log.info("🧹 Evicted cached video: %s", os.path.basename(path))
+        except Exception as e:
+            log.warning("Could not evict cached videos: %s", e)
+    
+    def _cleanup_temp_files(self, script_path: str, media_dir: str):
+        """Clean up manim script file and this render's media folder after processing"""
+        try:
+            # Clean up the script file (it may never have been written if the render failed early)
+            try:
                 os.remove(script_path)
-                print(f"🧹 Cleaned up manim script: {os.path.basename(script_path)}")
+                log.debug("🧹 Cleaned up manim script: %s", os.path.basename(script_path))
+            except FileNotFoundError:
+                pass
             
             # Clean up the media folder (contains intermediate files from manim)
-            media_dir = os.path.join(self.visualizations_dir, "media")
-            if os.path.exists(media_dir):
-                import shutil
+            import shutil
+            try:
                 shutil.rmtree(media_dir)
-                print(f"🧹 Cleaned up media folder: {media_dir}")
+                log.debug("🧹 Cleaned up media folder: %s", media_dir)
+            except FileNotFoundError:
+                pass
                 
         except Exception as e:
-            print(f"Warning: Could not clean up files: {e}")
+            log.warning("Could not clean up files: %s", e)
+    
+    def _schedule_cleanup(self, script_path: str, media_dir: str):
+        """Run _cleanup_temp_files in a worker thread so deleting files doesn't delay the response"""
+        task = asyncio.ensure_future(asyncio.to_thread(self._cleanup_temp_files, script_path, media_dir))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+    
+    async def _read_output_tail(self, stream: asyncio.StreamReader, limit: int = 64 * 1024) -> bytes:
+        """Drain a subprocess stream, keeping only its last limit bytes"""
+        tail = bytearray()
+        while chunk := await stream.read(64 * 1024):
+            tail += chunk
+            if len(tail) > limit:
+                del tail[:-limit]
+        return bytes(tail)
+    
+    def _find_rendered_video(self, media_dir: str, script_filename: str, video_filename: str) -> Optional[str]:
+        """Find a rendered video, which Manim writes to <media_dir>/videos/<script stem>/<quality>/"""
+        scene_dir = os.path.join(media_dir, "videos", os.path.splitext(script_filename)[0])
+        
+        # With -ql the location is known, so a single stat finds it
+        expected_path = os.path.join(scene_dir, _LOW_QUALITY_DIR, video_filename)
+        if os.path.isfile(expected_path):
+            return expected_path
+        
+        # Otherwise (e.g. a config file overriding the frame rate) check each quality folder
+        try:
+            with os.scandir(scene_dir) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        candidate = os.path.join(entry.path, video_filename)
+                        if os.path.isfile(candidate):
+                            return candidate
+        except FileNotFoundError:
+            pass
+        return None
     
     def _fix_common_manim_errors(self, script: str) -> str:
         """Fix common Manim errors in the script"""
@@ -75,11 +174,24 @@ class VisualizationTools:
         Returns:
             Dict with success status, video path, and any error messages
         """
+        # Identical script/scene pairs render identical videos, so reuse a previous render
+        cache_path = self._video_cache_path(manim_script, scene_name)
+        if os.path.exists(cache_path):
+            os.utime(cache_path)  # Mark as recently used for LRU eviction
+            log.info("♻️ Reusing cached visualization: %s", os.path.basename(cache_path))
+            return {
+                "success": True,
+                "video_path": cache_path,
+                "message": f"Video loaded from cache: {os.path.basename(cache_path)}"
+            }
+        
         try:
             # Generate unique filename for the script
             script_id = str(uuid.uuid4())[:8]
             script_filename = f"manim_script_{script_id}.py"
-            script_path = os.path.join(self.visualizations_dir, script_filename)
+            script_path = os.path.abspath(os.path.join(self.scripts_dir, script_filename))
+            # Each render gets its own media folder so concurrent renders can't delete each other's files
+            media_dir = os.path.join(self.visualizations_dir, f"media_{script_id}")
             
             # Clean the script content - remove escaped newlines
             cleaned_script = manim_script.replace('\\n', '\n').replace('\\', '')
@@ -96,22 +208,19 @@ class VisualizationTools:
                 f.write(cleaned_script)
             
             # Debug: Print the script content for debugging (commented out for production)
-            # print(f"🔍 Generated Manim script for {scene_name}:")
-            # print("=" * 50)
-            # print(cleaned_script)
-            # print("=" * 50)
+            # log.debug("🔍 Generated Manim script for %s:\n%s", scene_name, cleaned_script)
             
             # Generate output video filename
             video_filename = f"visualization_{script_id}.mp4"
-            video_path = os.path.join(self.visualizations_dir, video_filename)
             
             # Run Manim command asynchronously
             cmd = [
                 "manim",
                 "-ql",  # Quality low for faster rendering (removed -p to prevent auto-opening)
-                os.path.basename(script_path),
+                script_path,
                 scene_name,
-                "-o", video_filename
+                "--output_file", video_filename,
+                "--media_dir", os.path.basename(media_dir)
             ]
             
             # Execute Manim command
@@ -119,72 +228,66 @@ class VisualizationTools:
             env = os.environ.copy()
             env["PATH"] = "/Library/TeX/texbin:" + env.get("PATH", "")
             
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                cwd=os.path.dirname(script_path),
-                env=env,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+            async with self._render_semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=self.visualizations_dir,
+                    env=env,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+                
+                try:
+                    # Manim logs a lot of progress output; only its tail is useful, and only on failure
+                    output = await self._read_output_tail(process.stdout)
+                    await process.wait()
+                except asyncio.CancelledError:
+                    # The caller gave up on this render (e.g. a hedged attempt lost); stop Manim too
+                    process.kill()
+                    await process.wait()
+                    self._schedule_cleanup(script_path, media_dir)
+                    raise
             
             if process.returncode == 0:
                 # Look for the video in the media directory structure
-                media_dir = os.path.join(self.visualizations_dir, "media", "videos")
-                video_found = False
-                actual_video_path = None
-                
-                if os.path.exists(media_dir):
-                    for root, dirs, files in os.walk(media_dir):
-                        for file in files:
-                            if file == video_filename:
-                                actual_video_path = os.path.join(root, file)
-                                video_found = True
-                                break
-                        if video_found:
-                            break
+                actual_video_path = self._find_rendered_video(media_dir, script_filename, video_filename)
                 
-                if video_found and actual_video_path:
-                    # Copy video to the expected location for easier access
-                    import shutil
-                    shutil.copy2(actual_video_path, video_path)
+                if actual_video_path:
+                    # Store the video in the cache, which is also where it is served from
+                    self._store_cached_video(actual_video_path, cache_path)
                     
                     # Clean up the manim script file and media folder after successful video generation
-                    self._cleanup_temp_files(script_path)
+                    self._schedule_cleanup(script_path, media_dir)
                     
                     return {
                         "success": True,
-                        "video_path": video_path,
+                        "video_path": cache_path,
                         "script_path": script_path,
                         "message": f"Video generated successfully: {video_filename}"
                     }
                 else:
                     # Clean up the manim script file and media folder even if video generation failed
-                    self._cleanup_temp_files(script_path)
+                    self._schedule_cleanup(script_path, media_dir)
                     return {
                         "success": False,
                         "error": "Video file was not created despite successful command execution",
-                        "stdout": stdout.decode(),
-                        "stderr": stderr.decode()
+                        "output": output.decode(errors="replace")
                     }
             else:
                 # Clean up the manim script file and media folder even if manim command failed
-                self._cleanup_temp_files(script_path)
-                print(f"❌ Manim command failed with return code {process.returncode}")
-                print(f"STDOUT: {stdout.decode()}")
-                print(f"STDERR: {stderr.decode()}")
+                self._schedule_cleanup(script_path, media_dir)
+                output = output.decode(errors="replace")
+                log.error("❌ Manim command failed with return code %s\nOUTPUT: %s", process.returncode, output)
                 return {
                     "success": False,
                     "error": f"Manim command failed with return code {process.returncode}",
-                    "stdout": stdout.decode(),
-                    "stderr": stderr.decode()
+                    "output": output
                 }
                 
         except FileNotFoundError:
             # Clean up the manim script file and media folder even if manim is not found
             if 'script_path' in locals():
-                self._cleanup_temp_files(script_path)
+                self._schedule_cleanup(script_path, media_dir)
             return {
                 "success": False,
                 "error": "Manim is not installed. Please install it with: pip install manim"
@@ -192,7 +295,7 @@ class VisualizationTools:
         except Exception as e:
             # Clean up the manim script file and media folder even if there's an unexpected error
             if 'script_path' in locals():
-                self._cleanup_temp_files(script_path)
+                self._schedule_cleanup(script_path, media_dir)
             return {
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
@@ -201,17 +304,19 @@ class VisualizationTools:
     def cleanup_old_files(self, max_age_hours: int = 24):
         """Clean up old visualization files"""
         try:
-            current_time = datetime.now().timestamp()
-            max_age_seconds = max_age_hours * 3600
+            cutoff = datetime.now().timestamp() - max_age_hours * 3600
             
-            for filename in os.listdir(self.visualizations_dir):
-                file_path = os.path.join(self.visualizations_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > max_age_seconds:
-                        os.remove(file_path)
+            # scandir's entries carry the file type, so only regular files need a stat for their mtime
+            with os.scandir(self.visualizations_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        # Already removed, e.g. by a render's own cleanup
+                        pass
         except Exception as e:
-            print(f"Error cleaning up files: {e}")
+            log.error("Error cleaning up files: %s", e)
 
 # Global tools instance
 visualization_tools = VisualizationTools()